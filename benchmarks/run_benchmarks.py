@@ -0,0 +1,143 @@
+import argparse
+import json
+import os
+import sys
+import time
+from benchmarks.synthetic_offers import generate_flight_offers
+from frameworks.flask.map_rendering import MapRenderer, render_route_map
+from repositories.airport_index import AirportIndex
+from repositories.airport_spatial_index import AirportSpatialIndex
+from repositories.json_array_stream import JsonArrayStream
+from use_cases.build_routes import build_routes, iter_routes
+from use_cases.calculate_route_duration import convert_duration_to_minutes, convert_durations_to_minutes
+from use_cases.connection_scan import ConnectionTimetable
+from use_cases.find_best_flight import bellman_ford
+from use_cases.k_shortest_paths import k_shortest_routes
+from use_cases.pareto_routes import pareto_itineraries
+from use_cases.score_routes import CandidateRoutes, top_k_routes
+from use_cases.shortest_path import dijkstra
+
+AIRPORTS_SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests', 'data', 'airports_sample.dat')
+# Committed results for the default parameters, recorded with --repeat 10 --save-baseline. Timings depend on
+# the machine: record a fresh baseline on the machine that runs the comparison (e.g. as a first CI step
+# on the base branch) before judging a change against it.
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def measure(function, repeat):
+    # Best of several runs, which is the least noisy estimate on a shared machine
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def benchmark_cases(offers, max_segments, airports, seed):
+    flight_data = generate_flight_offers(offers, max_segments, airports, seed)
+    routes = build_routes(flight_data, convert_duration_to_minutes)
+    origin = routes[0].origin
+    destination = routes[0].destination
+    candidates = CandidateRoutes(routes)
+    # The payload as it comes over the wire, in 64 KiB chunks
+    body = json.dumps(flight_data).encode('utf-8')
+    chunks = [body[start:start + 65536] for start in range(0, len(body), 65536)]
+    # Durations of a larger offer set, where the same few hundred strings keep coming back as they do from Amadeus
+    durations = [itinerary['duration'] for offer in generate_flight_offers(offers * 10, max_segments, airports, seed)['data']
+                 for itinerary in offer['itineraries']]
+
+    airport_index = AirportIndex(AIRPORTS_SAMPLE)
+    lookup_codes = [airport.code for airport in airport_index if airport.code] * 100
+    legs = [(airport.code, next_airport.code, (airport.latitude, airport.longitude), (next_airport.latitude, next_airport.longitude))
+            for airport, next_airport in zip(list(airport_index)[:4], list(airport_index)[1:5])]
+
+    spatial_index = AirportSpatialIndex(airport_index)
+    points = [(airport.latitude + 0.5, airport.longitude - 0.5) for airport in airport_index] * 10
+
+    map_renderer = MapRenderer()
+
+    return {
+        'convert_duration_to_minutes': lambda: [convert_duration_to_minutes(duration) for duration in durations],
+        'convert_durations_to_minutes': lambda: convert_durations_to_minutes(durations),
+        'build_routes': lambda: build_routes(flight_data, convert_duration_to_minutes),
+        'parse_and_build_routes': lambda: build_routes(json.loads(b''.join(chunks)), convert_duration_to_minutes),
+        'stream_routes': lambda: list(iter_routes(JsonArrayStream(chunks), convert_duration_to_minutes)),
+        'bellman_ford': lambda: bellman_ford(routes, origin),
+        'dijkstra': lambda: dijkstra(routes, origin),
+        'k_shortest_routes': lambda: k_shortest_routes(routes, origin, k=10),
+        'connection_scan': lambda: ConnectionTimetable(routes).earliest_arrival(origin, destination),
+        'pareto_itineraries': lambda: pareto_itineraries(routes),
+        'top_k_routes': lambda: top_k_routes(routes, 10),
+        'rerank_candidates': lambda: candidates.rank(10, {'duration': 1, 'price': 2}, max_stops=1),
+        'airport_lookup': lambda: [airport_index.coordinates(code) for code in lookup_codes],
+        'nearest_airports': lambda: [spatial_index.nearest(latitude, longitude, 5) for latitude, longitude in points],
+        'render_route_map': lambda: render_route_map(legs),
+        'cached_route_map': lambda: map_renderer.render(legs),
+    }
+
+
+def run(offers, max_segments, airports, seed, repeat, only=None):
+    results = {}
+    for name, function in benchmark_cases(offers, max_segments, airports, seed).items():
+        if only and name not in only:
+            continue
+        results[name] = measure(function, repeat)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # A case regresses when it is slower than its baseline by more than the tolerance factor
+    regressions = {}
+    for name, seconds in results.items():
+        reference = baseline.get(name)
+        if reference and seconds > reference * tolerance:
+            regressions[name] = seconds / reference
+    return regressions
+
+
+def main():
+    # Run from the repository root: python -m benchmarks.run_benchmarks
+    parser = argparse.ArgumentParser(description='Benchmark the flight search pipeline on synthetic Amadeus offers')
+    parser.add_argument('--offers', type=int, default=250, help='Flight offers in the synthetic payload')
+    parser.add_argument('--segments', type=int, default=3, help='Maximum segments per itinerary')
+    parser.add_argument('--airports', type=int, default=40, help='Distinct airports in the synthetic network')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='*', help='Run only these benchmark cases')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='Allowed slowdown factor against the baseline')
+    args = parser.parse_args()
+
+    results = run(args.offers, args.segments, args.airports, args.seed, args.repeat, args.only)
+    parameters = {'offers': args.offers, 'segments': args.segments, 'airports': args.airports, 'seed': args.seed}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            stored = json.load(baseline_file)
+        if stored.get('parameters') == parameters:
+            baseline = stored['results']
+        else:
+            print(f"Baseline {args.baseline} was recorded with {stored.get('parameters')}, not comparing")
+
+    regressions = compare(results, baseline, args.tolerance)
+    for name, seconds in results.items():
+        line = f"{name:<30} {seconds * 1000:10.3f} ms"
+        if name in baseline:
+            line += f"  (baseline {baseline[name] * 1000:.3f} ms, x{seconds / baseline[name]:.2f})"
+        if name in regressions:
+            line += "  REGRESSION"
+        print(line)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({'parameters': parameters, 'results': results}, baseline_file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
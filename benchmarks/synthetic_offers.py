@@ -0,0 +1,96 @@
+import random
+import string
+from datetime import datetime, timedelta
+
+CARRIERS = ('IB', 'VY', 'UX', 'BA', 'AF', 'KL', 'LH', 'LX', 'TP', 'AZ', 'DL', 'UA', 'AA', 'EK', 'QR')
+AIRCRAFT = ('320', '321', '32N', '738', '73H', '788', '789', '333', '359', 'E90')
+
+
+def airport_codes(count, seed=0):
+    # Deterministic pool of distinct three-letter codes
+    generator = random.Random(seed)
+    codes = set()
+    while len(codes) < count:
+        codes.add(''.join(generator.choice(string.ascii_uppercase) for _ in range(3)))
+    return sorted(codes)
+
+
+def format_duration(minutes):
+    hours, minutes = divmod(int(minutes), 60)
+    if hours and minutes:
+        return f'PT{hours}H{minutes}M'
+    if hours:
+        return f'PT{hours}H'
+    return f'PT{minutes}M'
+
+
+def generate_flight_offers(offers=50, max_segments=3, airports=30, seed=0,
+                           origin=None, destination=None, departure_date='2026-11-02'):
+    generator = random.Random(seed)
+    codes = airport_codes(max(airports, 2), seed)
+    origin = origin or codes[0]
+    destination = destination or codes[1]
+    hubs = [code for code in codes if code not in (origin, destination)] or [origin]
+    day_start = datetime.strptime(departure_date, '%Y-%m-%d')
+
+    data = []
+    segment_id = 0
+    for offer_id in range(1, offers + 1):
+        segment_count = generator.randint(1, max_segments)
+        stops = generator.sample(hubs, min(segment_count - 1, len(hubs)))
+        path = [origin] + stops + [destination]
+
+        departs_at = day_start + timedelta(minutes=generator.randrange(5 * 60, 22 * 60, 5))
+        first_departure = departs_at
+        segments = []
+        for departure, arrival in zip(path, path[1:]):
+            flight_minutes = generator.randrange(45, 11 * 60, 5)
+            arrives_at = departs_at + timedelta(minutes=flight_minutes)
+            segment_id += 1
+            segments.append({
+                'departure': {'iataCode': departure, 'terminal': str(generator.randint(1, 4)), 'at': departs_at.isoformat()},
+                'arrival': {'iataCode': arrival, 'terminal': str(generator.randint(1, 4)), 'at': arrives_at.isoformat()},
+                'carrierCode': generator.choice(CARRIERS),
+                'number': str(generator.randint(10, 9999)),
+                'aircraft': {'code': generator.choice(AIRCRAFT)},
+                'operating': {'carrierCode': generator.choice(CARRIERS)},
+                'duration': format_duration(flight_minutes),
+                'id': str(segment_id),
+                'numberOfStops': 0,
+                'blacklistedInEU': False
+            })
+            # Layover before the next leg
+            departs_at = arrives_at + timedelta(minutes=generator.randrange(45, 6 * 60, 5))
+
+        total_minutes = (arrives_at - first_departure).total_seconds() // 60
+        base = generator.uniform(30, 120) * len(segments) + total_minutes * generator.uniform(0.1, 0.4)
+        taxes = generator.uniform(10, 90)
+        data.append({
+            'type': 'flight-offer',
+            'id': str(offer_id),
+            'source': 'GDS',
+            'instantTicketingRequired': False,
+            'nonHomogeneous': False,
+            'oneWay': False,
+            'lastTicketingDate': departure_date,
+            'numberOfBookableSeats': generator.randint(1, 9),
+            'itineraries': [{'duration': format_duration(total_minutes), 'segments': segments}],
+            'price': {
+                'currency': 'EUR',
+                'total': f'{base + taxes:.2f}',
+                'base': f'{base:.2f}',
+                'grandTotal': f'{base + taxes:.2f}'
+            },
+            'validatingAirlineCodes': [segments[0]['carrierCode']]
+        })
+
+    used_codes = sorted({segment[side]['iataCode'] for offer in data
+                         for segment in offer['itineraries'][0]['segments'] for side in ('departure', 'arrival')})
+    return {
+        'meta': {'count': len(data)},
+        'data': data,
+        'dictionaries': {
+            'locations': {code: {'cityCode': code, 'countryCode': 'XX'} for code in used_codes},
+            'carriers': {carrier: carrier for carrier in CARRIERS}
+        }
+    }
@@ -1,8 +1,11 @@
 class Airport:
-    def __init__(self, code, name, city, country, latitude, longitude):
+    __slots__ = ('code', 'name', 'city', 'country', 'latitude', 'longitude', 'icao')
+
+    def __init__(self, code, name, city, country, latitude, longitude, icao=None):
         self.code = code
         self.name = name
         self.city = city
         self.country = country
         self.latitude = latitude
         self.longitude = longitude
+        self.icao = icao
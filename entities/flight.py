@@ -1,7 +1,25 @@
 class Flight:
-    def __init__(self, origin, destination, duration, price, segments):
+    __slots__ = ('origin', 'destination', 'duration', 'price', 'segments', 'currency', 'id')
+
+    def __init__(self, origin, destination, duration, price, segments, currency=None, id=None):
         self.origin = origin
         self.destination = destination
         self.duration = duration
         self.price = price
         self.segments = segments
+        self.currency = currency
+        self.id = id
+
+    @property
+    def stops(self):
+        return len(self.segments) - 1
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'duration': self.duration,
+            'stops': self.stops,
+            'price': self.price,
+            'currency': self.currency,
+            'segments': [segment.to_dict() for segment in self.segments]
+        }
@@ -0,0 +1,26 @@
+class Segment:
+    __slots__ = ('departure_code', 'arrival_code', 'departure_id', 'arrival_id',
+                 'departure_at', 'arrival_at', 'carrier_code', 'number', 'duration')
+
+    def __init__(self, departure_code, arrival_code, departure_id, arrival_id,
+                 departure_at, arrival_at, carrier_code, number=None, duration=None):
+        self.departure_code = departure_code
+        self.arrival_code = arrival_code
+        # Interned airport ids, shared by every segment parsed with the same AirportCodes table
+        self.departure_id = departure_id
+        self.arrival_id = arrival_id
+        self.departure_at = departure_at
+        self.arrival_at = arrival_at
+        self.carrier_code = carrier_code
+        self.number = number
+        self.duration = duration
+
+    def to_dict(self):
+        # Same shape as an Amadeus segment, for JSON responses
+        return {
+            'departure': {'iataCode': self.departure_code, 'at': self.departure_at},
+            'arrival': {'iataCode': self.arrival_code, 'at': self.arrival_at},
+            'carrierCode': self.carrier_code,
+            'number': self.number,
+            'duration': self.duration
+        }
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+import numpy as np
+from dotenv import load_dotenv
+from repositories.amadeus_flight_repository import AMADEUS_BASE_URL, AMADEUS_RATE_LIMIT, AmadeusFlightRepository
+from repositories.local_file_flight_repository import LocalFileFlightRepository
+from repositories.resilience import TokenBucket
+from repositories.sqlite_flight_repository import SqliteFlightRepository
+from use_cases.build_routes import flight_offers, iter_routes
+from use_cases.calculate_route_duration import convert_duration_to_minutes
+from use_cases.shortest_path import dijkstra
+
+# Records that do not need to be computed again when a run is resumed; errors and missing offer files are retried
+FINISHED_STATUSES = ('ok', 'no_routes')
+COLUMNS = ('origin', 'destination', 'date', 'status', 'routes', 'path', 'cost', 'price', 'currency', 'duration', 'stops',
+           'carriers', 'error')
+NUMERIC_COLUMNS = ('routes', 'cost', 'price', 'duration', 'stops')
+
+# Per worker process: (flight repository, find best flight use case, calculate route duration use case)
+_worker = None
+
+
+def read_od_pairs(path):
+    # CSV with origin,destination,date columns (header optional) or JSON lines with the same keys
+    pairs = []
+    with open(path, encoding='utf-8', newline='') as input_file:
+        if path.endswith(('.jsonl', '.ndjson')):
+            rows = ((record['origin'], record['destination'], record.get('date') or record['departure_date'])
+                    for record in map(json.loads, filter(str.strip, input_file)))
+        else:
+            rows = (row[:3] for row in csv.reader(input_file) if len(row) >= 3)
+        for origin, destination, departure_date in rows:
+            if origin.strip().lower() == 'origin':
+                continue
+            pairs.append((origin.strip().upper(), destination.strip().upper(), departure_date.strip()))
+    return pairs
+
+
+def pair_key(record):
+    return record['origin'], record['destination'], record['date']
+
+
+def load_checkpoint(path):
+    # The JSON lines output is the checkpoint: every record is flushed as soon as it is written.
+    # A line cut short by a crash is dropped so appending continues on a clean line.
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'rb+') as output_file:
+        content = output_file.read()
+        complete = content.rfind(b'\n') + 1
+        if complete < len(content):
+            output_file.truncate(complete)
+    for line in content[:complete].decode('utf-8').splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def flight_repository_from_config(config):
+    if config.get('offers_dir'):
+        return LocalFileFlightRepository(config['offers_dir'])
+    # Workers share the Amadeus quota, so each gets its share of the rate
+    flight_repository = AmadeusFlightRepository(config['api_key'], config['api_secret'],
+                                                base_url=config.get('base_url') or AMADEUS_BASE_URL,
+                                                rate_limiter=TokenBucket(config['rate_limit']))
+    if config.get('offers_db'):
+        # Written through at once: a worker process can exit without a final flush
+        return SqliteFlightRepository(flight_repository, config['offers_db'], batch_size=1)
+    # Every pair is searched once, so offers are streamed straight into routes instead of being cached
+    return flight_repository
+
+
+def init_worker(config):
+    global _worker
+    _worker = (flight_repository_from_config(config), dijkstra, convert_duration_to_minutes)
+
+
+def optimize_pair(pair):
+    flight_repository, find_best_flight_use_case, calculate_route_duration_use_case = _worker
+    origin, destination, departure_date = pair
+    record = dict.fromkeys(COLUMNS)
+    record.update(origin=origin, destination=destination, date=departure_date, routes=0)
+    # Upstream error payloads end up here instead of in the offers
+    document = {}
+    try:
+        routes = list(iter_routes(flight_offers(flight_repository, origin, destination, departure_date, document=document),
+                                  calculate_route_duration_use_case))
+        if document.get('errors'):
+            record.update(status='error', error=f"Upstream errors: {json.dumps(document['errors'])}")
+            return record
+        record['routes'] = len(routes)
+        best_route = find_best_flight_use_case(routes, origin) if routes else None
+    except FileNotFoundError as error:
+        record.update(status='missing_offers', error=str(error))
+        return record
+    except Exception as error:
+        record.update(status='error', error=f"{type(error).__name__}: {error}")
+        return record
+
+    if best_route is None:
+        record['status'] = 'no_routes'
+        return record
+    record.update(
+        status='ok',
+        path=getattr(best_route, 'path', None) or [segment.departure_code for segment in best_route.segments] + [best_route.destination],
+        cost=getattr(best_route, 'cost', None),
+        price=best_route.price,
+        currency=best_route.currency,
+        duration=best_route.duration,
+        stops=best_route.stops,
+        carriers=sorted({segment.carrier_code for segment in best_route.segments if segment.carrier_code})
+    )
+    return record
+
+
+def write_columnar(records, path):
+    # One array per column in a compressed .npz; lists are joined with '-' so every column is flat
+    columns = {}
+    for column in COLUMNS:
+        values = [record.get(column) for record in records]
+        if column in NUMERIC_COLUMNS:
+            columns[column] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+        else:
+            columns[column] = np.array(['-'.join(value) if isinstance(value, list) else ('' if value is None else str(value))
+                                        for value in values], dtype=str)
+    np.savez_compressed(path, **columns)
+    return len(records)
+
+
+def run_batch(input_path, output_path, config, processes=None, resume=True, columnar_path=None,
+              progress_interval=5.0, chunksize=4, progress_file=sys.stderr):
+    pairs = read_od_pairs(input_path)
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+    finished = {pair_key(record): record for record in load_checkpoint(output_path)
+                if record.get('status') in FINISHED_STATUSES}
+    # Duplicated input rows are computed once
+    distinct = list(dict.fromkeys(pairs))
+    pending = [pair for pair in distinct if pair not in finished]
+
+    summary = {'pairs': len(pairs), 'skipped': len(distinct) - len(pending), 'processed': 0, 'errors': 0}
+    started = last_report = time.monotonic()
+    if pending:
+        with open(output_path, 'a', encoding='utf-8') as output_file, \
+                multiprocessing.Pool(processes, initializer=init_worker, initargs=(config,)) as pool:
+            for record in pool.imap_unordered(optimize_pair, pending, chunksize):
+                output_file.write(json.dumps(record) + '\n')
+                output_file.flush()
+                summary['processed'] += 1
+                if record['status'] not in FINISHED_STATUSES:
+                    summary['errors'] += 1
+
+                now = time.monotonic()
+                if progress_file is not None and (now - last_report >= progress_interval or summary['processed'] == len(pending)):
+                    last_report = now
+                    rate = summary['processed'] / max(now - started, 1e-9)
+                    print(f"{summary['processed']}/{len(pending)} pairs optimized ({rate:.1f}/s), {summary['errors']} errors",
+                          file=progress_file, flush=True)
+
+    if columnar_path:
+        # Latest record per pair, in input order
+        latest = {pair_key(record): record for record in load_checkpoint(output_path)}
+        write_columnar([latest[pair] for pair in distinct if pair in latest], columnar_path)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the best route for every (origin, destination, date) in a file')
+    parser.add_argument('input', help='CSV (origin,destination,date) or JSON lines file of OD pairs')
+    parser.add_argument('output', help='JSON lines file of results, also the checkpoint a rerun resumes from')
+    parser.add_argument('--offers-dir', help='Read offers saved as ORIGIN-DESTINATION-DATE.json instead of calling Amadeus')
+    parser.add_argument('--offers-db', help='SQLite offer cache shared by the workers and later runs')
+    parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--columnar', help='Also write the results as column arrays to this .npz file')
+    parser.add_argument('--restart', action='store_true', help='Discard earlier results instead of resuming')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='Seconds between progress reports')
+    args = parser.parse_args()
+
+    load_dotenv()
+    processes = max(1, args.processes or 1)
+    config = {
+        'offers_dir': args.offers_dir,
+        'offers_db': args.offers_db,
+        'api_key': os.getenv('API_KEY'),
+        'api_secret': os.getenv('API_SECRET'),
+        # The production API instead of the test environment, for instance
+        'base_url': os.getenv('AMADEUS_BASE_URL'),
+        'rate_limit': float(os.getenv('AMADEUS_RATE_LIMIT', AMADEUS_RATE_LIMIT)) / processes
+    }
+    summary = run_batch(args.input, args.output, config, processes, not args.restart, args.columnar, args.progress_interval)
+    print(f"{summary['processed']} pairs optimized, {summary['skipped']} already done, {summary['errors']} errors")
+    return 1 if summary['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
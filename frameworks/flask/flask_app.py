@@ -1,21 +1,98 @@
-from flask import Flask, request, render_template, jsonify
-from use_cases.find_best_flight import bellman_ford
-from use_cases.calculate_route_duration import convert_duration_to_minutes
-import folium
+from flask import Flask, request, render_template, jsonify, Response, stream_with_context
+import json
+import time
+from datetime import datetime
+from frameworks.flask.map_rendering import MapRenderer
+from frameworks.instrumentation import MetricsRegistry
+from use_cases.build_routes import AirportCodes, build_routes, flight_offers, iter_routes
+from use_cases.k_shortest_paths import k_shortest_routes
+from use_cases.fan_out_search import date_window, iter_search_results, parse_airport_codes, search_combinations, search_flexible, upstream_error
+from use_cases.pareto_routes import pareto_itineraries
+from use_cases.route_geometry import route_geometry
+from use_cases.score_routes import CandidateRoutes, top_k_routes
 from repositories.amadeus_flight_repository import AmadeusFlightRepository
+from repositories.coalescing_flight_repository import SingleFlight
 from repositories.openflights_airport_repository import OpenFlightsAirportRepository
+from repositories.resilience import UpstreamError
+from repositories.search_store import SearchStore
 
-def create_app(flight_repository, airport_repository, find_best_flight_use_case, calculate_route_duration_use_case):
+AIRPORT_SEARCH_DEFAULT_LIMIT = 10
+AIRPORT_SEARCH_MAX_LIMIT = 50
+MAX_FLEX_DAYS = 3
+# Parameters of /api/search/<search_id>/ranking other than the criteria weights
+RANKING_OPTIONS = ('weights', 'k', 'max_stops', 'carriers', 'exclude_carriers')
+
+
+def search_origin(origins, origin):
+    # A single airport is passed to the optimizer as is; several fall back to the itineraries' own origins
+    return origins[0] if len(origins) == 1 else origin
+
+
+def request_params():
+    # A JSON object body, otherwise the query string and form fields; None for a JSON body that is not an object
+    params = request.get_json(silent=True)
+    if params is None:
+        return request.values
+    if not isinstance(params, dict):
+        return None
+    return params or request.values
+
+
+def valid_date(value):
+    # YYYY-MM-DD, the format Amadeus expects
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def list_param(value):
+    # Comma separated string or JSON list
+    if isinstance(value, (list, tuple)):
+        value = ','.join(str(item) for item in value)
+    return parse_airport_codes(str(value or ''))
+
+
+def create_app(flight_repository, airport_repository, find_best_flight_use_case, calculate_route_duration_use_case, metrics=None,
+               search_store=None):
     app = Flask(__name__)
+    metrics = metrics if metrics is not None else MetricsRegistry()
+    # Candidates of recent API searches, re-ranked by /api/search/<search_id>/ranking without refetching
+    search_store = search_store if search_store is not None else SearchStore()
+    request_count = metrics.counter('http_requests_total', 'HTTP requests handled.', ['method', 'endpoint', 'status'])
+    request_latency = metrics.histogram('http_request_duration_seconds', 'HTTP request latency.', ['method', 'endpoint'])
+    coalesced_searches = metrics.counter('search_coalesced_total', 'Searches that reused an identical in-flight search.')
+    map_renderer = MapRenderer()
+    searches_in_flight = SingleFlight()
+
+    @app.before_request
+    def start_request_timer():
+        request.environ['flight_route_optimizer.started'] = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = request.environ.get('flight_route_optimizer.started')
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        request_count.inc(request.method, endpoint, response.status_code)
+        if started is not None:
+            request_latency.observe(time.perf_counter() - started, request.method, endpoint)
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics_endpoint():
+        return Response(metrics.expose(), mimetype='text/plain; version=0.0.4')
 
     @app.route('/airportSearch/', methods=['GET'])
     def airport_search():
         query = request.args.get('term', '')
         if not query:
             return jsonify([])
+        limit = request.args.get('limit', AIRPORT_SEARCH_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, AIRPORT_SEARCH_MAX_LIMIT))
 
-        # Llamar a la nueva función en OpenFlightsAirportRepository
-        airports = airport_repository.search_airports(query)
+        # Top-N airports from the prebuilt autocomplete index
+        airports = airport_repository.search_airports(query, limit)
 
         # Formatear los resultados para el autocompletado
         results = []
@@ -27,76 +104,234 @@ def create_app(flight_repository, airport_repository, find_best_flight_use_case,
 
         return jsonify(results)
 
-    @app.route('/', methods=['GET', 'POST'])
-    def home():
-        if request.method == 'POST':
-            origin = request.form['origin']
-            destination = request.form['destination']
-            departure_date = request.form['date']
+    @app.route('/airportSearch/nearby', methods=['GET'])
+    def nearby_airport_search():
+        # Around an airport (?code=MAD) or a point (?lat=40.4&lon=-3.7), closest first
+        code = request.args.get('code', '').strip()
+        if code:
+            latitude, longitude = airport_repository.get_airport_coordinates(code)
+            if latitude is None or longitude is None:
+                return jsonify({'error': "unknown airport", 'airports': [code]}), 404
+        else:
+            latitude = request.args.get('lat', type=float)
+            longitude = request.args.get('lon', type=float)
+            if latitude is None or longitude is None or not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+                return jsonify({'error': "code or valid lat and lon are required"}), 400
+        limit = request.args.get('k', AIRPORT_SEARCH_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, AIRPORT_SEARCH_MAX_LIMIT))
+        radius_km = request.args.get('radius_km', type=float)
+        if radius_km is not None and radius_km < 0:
+            return jsonify({'error': "radius_km must not be negative"}), 400
+
+        results = []
+        for airport in airport_repository.nearest_airports(latitude, longitude, limit, radius_km):
+            results.append({
+                'label': f"{airport['city']}, {airport['name']} ({airport['iata']}) - {airport['country']}",
+                'value': airport['iata'],
+                'distance_km': airport['distance_km']
+            })
+
+        return jsonify(results)
+
+    def optimize(routes, origin):
+        best_route = find_best_flight_use_case(routes, origin)
+        if best_route is None:
+            return None, None, routes
+        # Fastest, cheapest and best balance all come from one Pareto front
+        highlights = pareto_itineraries(routes)
+        # Every candidate, best score first
+        return best_route, highlights, top_k_routes(routes, len(routes))
+
+    def ranking_record(best_route, highlights, ranked, search_id=None):
+        # Routes are referred to by the id they were sent to the client with
+        record = {'type': 'result', 'search_id': search_id, 'best_route': None, 'highlights': None, 'ranking': []}
+        if best_route is not None:
+            record['best_route'] = {'id': best_route.id, 'path': getattr(best_route, 'path', None), 'cost': getattr(best_route, 'cost', None)}
+            record['highlights'] = {name: highlights[name].id for name in ('fastest', 'cheapest', 'best_balance')}
+            record['ranking'] = [route.id for route in ranked]
+        return record
 
-            flight_data = flight_repository.get_flight_data(origin, destination, departure_date)
+    def run_search(origins, destinations, departure_date, flex_days, origin):
+        if len(origins) == 1 and len(destinations) == 1 and not flex_days:
+            # Offers are turned into routes while the response is still being read, so there is
+            # no separate route building stage and only the routes are kept
+            with metrics.stage_timer('upstream_fetch'):
+                routes = list(iter_routes(flight_offers(flight_repository, origins[0], destinations[0], departure_date),
+                                          calculate_route_duration_use_case))
+        else:
+            with metrics.stage_timer('upstream_fetch'):
+                flight_data = search_flexible(flight_repository, origins, destinations, departure_date, flex_days)
+            with metrics.stage_timer('route_building'):
+                routes = build_routes(flight_data, calculate_route_duration_use_case)
+        if not routes:
+            return routes, None, None, []
 
+        with metrics.stage_timer('optimization'):
+            # Ranked itineraries through the segment graph, to fall back on when an offer is sold out
+            alternatives = k_shortest_routes(routes, origin)
+            best_route, highlights, routes = optimize(routes, origin)
+        return routes, best_route, highlights, alternatives
+
+    @app.route('/api/search', methods=['GET', 'POST'])
+    def api_search():
+        params = request_params()
+        if params is None:
+            return jsonify({'error': "the JSON body must be an object"}), 400
+        origins = parse_airport_codes(str(params.get('origin', '')))
+        destinations = parse_airport_codes(str(params.get('destination', '')))
+        departure_date = params.get('date')
+        if not origins or not destinations or not departure_date:
+            return jsonify({'error': "origin, destination and date are required"}), 400
+        if not valid_date(departure_date):
+            return jsonify({'error': "date must be YYYY-MM-DD"}), 400
+        try:
+            flex_days = max(0, min(int(params.get('flex_days', 0)), MAX_FLEX_DAYS))
+        except (TypeError, ValueError):
+            return jsonify({'error': "flex_days must be an integer"}), 400
+        origin = search_origin(origins, ','.join(origins))
+        combinations = search_combinations(origins, destinations, date_window(departure_date, flex_days))
+
+        def search_records():
+            # One record per upstream response as soon as it arrives, then the ranking over all of them
             routes = []
-            if 'data' in flight_data:
-                for flight in flight_data['data']:
-                    itineraries = flight['itineraries']
-                    price = flight['price']['total']
-                    currency = flight['price']['currency']
-                    for itinerary in itineraries:
-                        duration = itinerary['duration']
-                        segments = itinerary['segments']
-                        stops = len(segments) - 1
-                        formatted_duration = convert_duration_to_minutes(duration)
-                        route = {
-                            'duration': formatted_duration,
-                            'stops': stops,
-                            'price': price,
-                            'currency': currency,
-                            'segments': segments
-                        }
-                        routes.append(route)
+            airport_codes = AirportCodes()
+            for (search_from, search_to, search_date), flight_data, error in iter_search_results(flight_repository, combinations):
+                # An upstream error payload is a failed search, not one without offers
+                if error is None:
+                    error = upstream_error(flight_data)
+                new_routes = []
+                if flight_data:
+                    new_routes = build_routes(flight_data, calculate_route_duration_use_case, airport_codes, first_id=len(routes))
+                routes.extend(new_routes)
+                yield {
+                    'type': 'routes',
+                    'search': {'origin': search_from, 'destination': search_to, 'date': search_date,
+                               'error': str(error) if error is not None else None},
+                    'routes': [route.to_dict() for route in new_routes]
+                }
+            search_id = None
+            with metrics.stage_timer('optimization'):
+                if routes:
+                    best_route, highlights, ranked = optimize(routes, origin)
+                    search_id = search_store.put(CandidateRoutes(routes))
+                else:
+                    best_route, highlights, ranked = None, None, []
+            yield ranking_record(best_route, highlights, ranked, search_id)
 
-            if not routes:
-                return render_template('index.html', error="No flights found")
+        if str(params.get('stream', '')).lower() in ('1', 'true', 'yes'):
+            lines = (json.dumps(record) + '\n' for record in search_records())
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+        result = {'origin': origins, 'destination': destinations, 'date': departure_date, 'flex_days': flex_days,
+                  'searches': [], 'routes': []}
+        for record in search_records():
+            if record['type'] == 'routes':
+                result['searches'].append(record['search'])
+                result['routes'].extend(record['routes'])
+            else:
+                result.update(search_id=record['search_id'], best_route=record['best_route'], highlights=record['highlights'],
+                              ranking=record['ranking'])
+        return jsonify(result)
 
-            best_route = bellman_ford(routes, origin)
+    @app.route('/api/search/<search_id>/ranking', methods=['GET', 'POST'])
+    def api_search_ranking(search_id):
+        candidates = search_store.get(search_id)
+        if candidates is None:
+            return jsonify({'error': "unknown or expired search", 'search_id': search_id}), 404
 
-            world_map = folium.Map(location=[20, 0], zoom_start=2)
+        params = request_params()
+        if params is None:
+            return jsonify({'error': "the JSON body must be an object"}), 400
+        # Weights as a JSON object or one parameter per criterion, e.g. ?duration=1&price=2.
+        # Any other parameter is taken for a criterion, so an unknown one is rejected rather than ignored.
+        weights = params.get('weights')
+        if not isinstance(weights, dict):
+            weights = {name: params[name] for name in params if name not in RANKING_OPTIONS} or None
+        try:
+            if weights is not None:
+                weights = {criterion: float(weight) for criterion, weight in weights.items()}
+            max_stops = params.get('max_stops')
+            max_stops = int(max_stops) if max_stops not in (None, '') else None
+            k = params.get('k')
+            k = max(0, int(k)) if k not in (None, '') else None
+            with metrics.stage_timer('reranking'):
+                ranked = candidates.rank(k, weights, max_stops, list_param(params.get('carriers')),
+                                         list_param(params.get('exclude_carriers')))
+        except (TypeError, ValueError) as error:
+            return jsonify({'error': str(error)}), 400
 
-            for segment in best_route['segments']:
-                origin_iata = segment['departure']['iataCode']
-                destination_iata = segment['arrival']['iataCode']
+        return jsonify({
+            'search_id': search_id,
+            'candidates': len(candidates),
+            'carriers': candidates.carriers,
+            'ranking': [route.id for route, _ in ranked],
+            'scores': [score for _, score in ranked]
+        })
 
-                lat1, lon1 = airport_repository.get_airport_coordinates(origin_iata)
-                lat2, lon2 = airport_repository.get_airport_coordinates(destination_iata)
+    @app.route('/api/route-geometry', methods=['GET'])
+    def api_route_geometry():
+        codes = parse_airport_codes(request.args.get('path', ''))
+        if len(codes) < 2:
+            return jsonify({'error': "path needs at least two comma separated IATA codes"}), 400
 
-                if lat1 and lon1 and lat2 and lon2:
-                    folium.PolyLine([(lat1, lon1), (lat2, lon2)], color='green', weight=5, tooltip="Best route").add_to(world_map)
+        airports = []
+        unknown = []
+        for code in codes:
+            latitude, longitude = airport_repository.get_airport_coordinates(code)
+            if latitude is None or longitude is None:
+                unknown.append(code)
+            airports.append((code, latitude, longitude))
+        if unknown:
+            return jsonify({'error': "unknown airports", 'airports': unknown}), 404
 
-                # Add circle markers for origin and destination airports
-                folium.CircleMarker(
-                    location=[lat1, lon1],
-                    radius=8,
-                    color='blue',
-                    fill=True,
-                    fill_color='blue',
-                    fill_opacity=0.7,
-                    tooltip=f'Origin: {origin_iata}'
-                ).add_to(world_map)
+        return jsonify(route_geometry(airports))
+
+    @app.route('/', methods=['GET', 'POST'])
+    def home():
+        if request.method == 'POST':
+            origin = request.form['origin']
+            destination = request.form['destination']
+            departure_date = request.form['date']
+            if not valid_date(departure_date):
+                return render_template('index.html', error="Enter the departure date as YYYY-MM-DD"), 400
+            # Comma separated airports and a +/- day window fan out into one upstream call per combination
+            origins = parse_airport_codes(origin)
+            destinations = parse_airport_codes(destination)
+            flex_days = max(0, min(request.form.get('flex_days', 0, type=int), MAX_FLEX_DAYS))
+
+            # Identical searches submitted at the same time share one fetch and one optimization run
+            search_key = (tuple(origins), tuple(destinations), departure_date, flex_days)
+            try:
+                (routes, best_route, highlights, alternatives), shared = searches_in_flight.do(
+                    search_key, lambda: run_search(origins, destinations, departure_date, flex_days, search_origin(origins, origin)))
+            except UpstreamError:
+                # Retries were exhausted or the circuit is open: answer now instead of holding the worker
+                return render_template('index.html', error="Flight search is temporarily unavailable, please try again later"), 503
+            if shared:
+                coalesced_searches.inc()
+
+            if not routes:
+                return render_template('index.html', error="No flights found")
+            if best_route is None:
+                return render_template('index.html', error="No route found")
 
-                folium.CircleMarker(
-                    location=[lat2, lon2],
-                    radius=8,
-                    color='red',
-                    fill=True,
-                    fill_color='red',
-                    fill_opacity=0.7,
-                    tooltip=f'Destination: {destination_iata}'
-                ).add_to(world_map)
+            with metrics.stage_timer('coordinate_lookup'):
+                legs = []
+                for segment in best_route.segments:
+                    origin_iata = segment.departure_code
+                    destination_iata = segment.arrival_code
+                    legs.append((
+                        origin_iata,
+                        destination_iata,
+                        airport_repository.get_airport_coordinates(origin_iata),
+                        airport_repository.get_airport_coordinates(destination_iata)
+                    ))
 
-            map_html = world_map._repr_html_()
+            with metrics.stage_timer('map_render'):
+                map_html = map_renderer.render(legs)
 
-            return render_template('search.html', origin=origin, destination=destination, routes=routes, map_html=map_html)
+            return render_template('search.html', origin=origin, destination=destination, routes=routes, highlights=highlights,
+                                   alternatives=alternatives, map_html=map_html)
 
         return render_template('index.html')
 
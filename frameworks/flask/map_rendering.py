@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+import folium
+from use_cases.route_geometry import great_circle_points
+
+
+def render_route_map(legs):
+    # legs: (origin IATA, destination IATA, (lat, lon) of origin, (lat, lon) of destination)
+    world_map = folium.Map(location=[20, 0], zoom_start=2)
+
+    for origin_iata, destination_iata, (lat1, lon1), (lat2, lon2) in legs:
+        # Airports without known coordinates are left off the map
+        if None not in (lat1, lon1, lat2, lon2):
+            points = [(latitude, longitude) for longitude, latitude in great_circle_points(lat1, lon1, lat2, lon2)]
+            folium.PolyLine(points, color='green', weight=5, tooltip="Best route").add_to(world_map)
+
+        # Add circle markers for origin and destination airports
+        if None not in (lat1, lon1):
+            folium.CircleMarker(
+                location=[lat1, lon1],
+                radius=8,
+                color='blue',
+                fill=True,
+                fill_color='blue',
+                fill_opacity=0.7,
+                tooltip=f'Origin: {origin_iata}'
+            ).add_to(world_map)
+
+        if None not in (lat2, lon2):
+            folium.CircleMarker(
+                location=[lat2, lon2],
+                radius=8,
+                color='red',
+                fill=True,
+                fill_color='red',
+                fill_opacity=0.7,
+                tooltip=f'Destination: {destination_iata}'
+            ).add_to(world_map)
+
+    return world_map._repr_html_()
+
+
+class MapRenderer:
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self._rendered = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, legs):
+        # Many searches end up with the same best route, so the HTML is keyed by its airport sequence
+        key = tuple(legs)
+        with self._lock:
+            map_html = self._rendered.get(key)
+            if map_html is not None:
+                self._rendered.move_to_end(key)
+                self.hits += 1
+                return map_html
+            self.misses += 1
+
+        map_html = render_route_map(legs)
+        with self._lock:
+            self._rendered[key] = map_html
+            while len(self._rendered) > self.max_entries:
+                self._rendered.popitem(last=False)
+        return map_html
@@ -0,0 +1,133 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; covers cache hits (sub-millisecond) up to slow upstream searches
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(level=None):
+    # Logging stays off unless LOG_LEVEL (or an explicit level) asks for it
+    level = level or os.getenv('LOG_LEVEL')
+    if not level:
+        return
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    logging.getLogger().setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def _format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for label_values, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.label_names, label_values, [('le', _format_value(bound))])
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.stage_seconds = self.histogram(
+            'flight_search_stage_seconds', 'Time spent in each stage of a flight search.', ['stage'])
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    @contextmanager
+    def stage_timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stage_seconds.observe(elapsed, stage)
+            logger.debug("stage %s took %.2f ms", stage, elapsed * 1000)
+
+    def expose(self):
+        # Prometheus text exposition format, version 0.0.4
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
@@ -1,3 +1,12 @@
 class AirportRepository:
     def get_airport_coordinates(self, iata_code):
         pass
+
+    def search_airports(self, query, limit=10):
+        pass
+
+    def nearest_airports(self, latitude, longitude, k=10, radius_km=None):
+        pass
+
+    def airports_within(self, latitude, longitude, radius_km):
+        pass
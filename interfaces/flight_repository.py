@@ -1,3 +1,35 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Monotonic time by which the upstream calls of the current search must be over, if any
+_deadline = contextvars.ContextVar('flight_search_deadline', default=None)
+
+
+@contextmanager
+def deadline(seconds):
+    # Repositories called inside the block stop waiting and retrying once `seconds` have passed
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    # Seconds left before the current deadline, None when there is none
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+
 class FlightRepository:
-    def get_flight_data(self, origin, destination, departure_date):
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
         pass
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None):
+        # Offers one at a time; the other members of the response (meta, errors...) go into `document`.
+        # Repositories that can decode offers while the response arrives override this.
+        flight_data = self.get_flight_data(origin, destination, departure_date, adults)
+        if document is not None:
+            document.update((key, value) for key, value in flight_data.items() if key != 'data')
+        return iter(flight_data.get('data', []))
@@ -1,20 +1,58 @@
 from frameworks.flask.flask_app import create_app
+from frameworks.instrumentation import configure_logging
 from repositories.openflights_airport_repository import OpenFlightsAirportRepository
-from repositories.amadeus_flight_repository import AmadeusFlightRepository
-from use_cases.find_best_flight import bellman_ford
+from repositories.airport_index import OPENFLIGHTS_AIRPORTS_URL
+from repositories.amadeus_flight_repository import AMADEUS_RATE_LIMIT, AmadeusFlightRepository
+from repositories.cached_flight_repository import CachedFlightRepository
+from repositories.coalescing_flight_repository import CoalescingFlightRepository
+from repositories.sqlite_airport_repository import SqliteAirportRepository
+from repositories.sqlite_flight_repository import SqliteFlightRepository
+from repositories.resilience import TokenBucket
+from use_cases.shortest_path import dijkstra
 from use_cases.calculate_route_duration import convert_duration_to_minutes
+import atexit
 import os
 from dotenv import load_dotenv
 
 def main():
     load_dotenv()
+    configure_logging()
     api_key = os.getenv('API_KEY')
     api_secret = os.getenv('API_SECRET')
+    # Either the OpenFlights URL or a local copy of airports.dat for offline use
+    airports_source = os.getenv('AIRPORTS_DATA', OPENFLIGHTS_AIRPORTS_URL)
+    # Snapshot built with `python -m repositories.airport_snapshot`, shared by all workers via mmap
+    airports_snapshot = os.getenv('AIRPORTS_SNAPSHOT')
 
-    airport_repository = OpenFlightsAirportRepository()
-    flight_repository = AmadeusFlightRepository(api_key, api_secret)
+    # SQLite files shared by every worker on the host, kept across restarts
+    airports_db = os.getenv('AIRPORTS_DB')
+    offers_db = os.getenv('OFFERS_DB')
+    # Requests per second allowed by the Amadeus plan in use
+    amadeus_rate_limit = float(os.getenv('AMADEUS_RATE_LIMIT', AMADEUS_RATE_LIMIT))
 
-    find_best_flight_use_case = bellman_ford
+    if airports_db:
+        airport_repository = SqliteAirportRepository(airports_db)
+        if not len(airport_repository):
+            airport_repository.import_airports(OpenFlightsAirportRepository(airports_source).index)
+    elif airports_snapshot:
+        # Only the airport table is shared through the mapping. The autocomplete and nearby indexes are
+        # Python objects private to each worker, so they are not warmed up: a worker builds them on its
+        # first /airportSearch/ or /airportSearch/nearby request and never pays for one it does not serve.
+        airport_repository = OpenFlightsAirportRepository.from_snapshot(airports_snapshot)
+    else:
+        airport_repository = OpenFlightsAirportRepository(airports_source)
+        airport_repository.warm_up()
+
+    # Cache misses for the same search are coalesced into a single Amadeus call
+    flight_repository = CoalescingFlightRepository(
+        AmadeusFlightRepository(api_key, api_secret, rate_limiter=TokenBucket(amadeus_rate_limit)))
+    if offers_db:
+        flight_repository = SqliteFlightRepository(flight_repository, offers_db)
+        # Offers still buffered when the server stops (or the debug reloader restarts it) are written out
+        atexit.register(flight_repository.close)
+    flight_repository = CachedFlightRepository(flight_repository)
+
+    find_best_flight_use_case = dijkstra
     calculate_route_duration_use_case = convert_duration_to_minutes
 
     app = create_app(flight_repository, airport_repository, find_best_flight_use_case, calculate_route_duration_use_case)
@@ -0,0 +1,102 @@
+import csv
+import threading
+import requests
+from entities.airport import Airport
+
+OPENFLIGHTS_AIRPORTS_URL = 'https://raw.githubusercontent.com/jpatokal/openflights/master/data/airports.dat'
+
+
+def _clean(value):
+    # OpenFlights marks missing values with \N
+    value = value.strip()
+    return '' if value == '\\N' else value
+
+
+def parse_airports(lines):
+    airports = []
+    # csv handles quoted fields that contain commas, e.g. "Madrid, Cuatro Vientos Airport"
+    for fields in csv.reader(lines):
+        if len(fields) < 8:
+            continue
+        try:
+            latitude = float(fields[6])
+            longitude = float(fields[7])
+        except ValueError:
+            continue
+        airports.append(Airport(
+            _clean(fields[4]).upper(),
+            _clean(fields[1]),
+            _clean(fields[2]),
+            _clean(fields[3]),
+            latitude,
+            longitude,
+            icao=_clean(fields[5]).upper()
+        ))
+    return airports
+
+
+class AirportIndex:
+    def __init__(self, source=OPENFLIGHTS_AIRPORTS_URL):
+        self.source = source
+        self._reload_lock = threading.RLock()
+        self._tables = None
+
+    def _read_source(self):
+        if self.source.startswith(('http://', 'https://')):
+            response = requests.get(self.source, timeout=30)
+            response.raise_for_status()
+            return response.text.splitlines()
+        with open(self.source, encoding='utf-8', newline='') as airports_file:
+            return airports_file.read().splitlines()
+
+    def reload(self):
+        with self._reload_lock:
+            airports = parse_airports(self._read_source())
+            by_iata = {}
+            by_icao = {}
+            for position, airport in enumerate(airports):
+                if airport.code:
+                    by_iata.setdefault(airport.code, position)
+                if airport.icao:
+                    by_icao.setdefault(airport.icao, position)
+            # Swap the tables in one assignment so readers never see a half-built index
+            self._tables = (airports, by_iata, by_icao)
+        return len(airports)
+
+    def _get_tables(self):
+        if self._tables is None:
+            with self._reload_lock:
+                if self._tables is None:
+                    self.reload()
+        return self._tables
+
+    def position(self, code):
+        if not code:
+            return None
+        _, by_iata, by_icao = self._get_tables()
+        code = code.strip().upper()
+        position = by_iata.get(code)
+        if position is None:
+            position = by_icao.get(code)
+        return position
+
+    def airport_at(self, position):
+        return self._get_tables()[0][position]
+
+    def get(self, code):
+        position = self.position(code)
+        if position is None:
+            return None
+        return self.airport_at(position)
+
+    def coordinates(self, code):
+        airport = self.get(code)
+        if airport is None:
+            return None, None
+        return airport.latitude, airport.longitude
+
+    def __len__(self):
+        return len(self._get_tables()[0])
+
+    def __iter__(self):
+        return iter(self._get_tables()[0])
@@ -0,0 +1,98 @@
+import heapq
+import re
+import unicodedata
+
+_WORD_SPLIT = re.compile(r'[^0-9a-z]+')
+
+# Short queries are answered from a prefix table, longer ones from trigram postings
+_PREFIX_LENGTH = 2
+_GRAM_SIZE = 3
+
+EXACT_IATA_MATCH = 0
+PREFIX_MATCH = 1
+SUBSTRING_MATCH = 2
+
+
+def fold(text):
+    # Lowercase and strip accents so "suarez" finds "Suárez"
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _starts_word(field, query):
+    position = field.find(query)
+    while position != -1:
+        if position == 0 or not field[position - 1].isalnum():
+            return True
+        position = field.find(query, position + 1)
+    return False
+
+
+def _trigrams(text):
+    return {text[i:i + _GRAM_SIZE] for i in range(len(text) - _GRAM_SIZE + 1)}
+
+
+class AirportSearchIndex:
+    def __init__(self, airports):
+        self._airports = []
+        # Searchable fields per airport in ranking order: IATA code, city, country, name
+        self._fields = []
+        self._prefixes = {}
+        self._trigram_postings = {}
+
+        for airport in airports:
+            if not airport.code:
+                continue
+            entry_id = len(self._airports)
+            fields = (fold(airport.code), fold(airport.city), fold(airport.country), fold(airport.name))
+            self._airports.append(airport)
+            self._fields.append(fields)
+
+            for field in fields:
+                for word in [field] + _WORD_SPLIT.split(field):
+                    for length in range(1, min(len(word), _PREFIX_LENGTH) + 1):
+                        self._prefixes.setdefault(word[:length], set()).add(entry_id)
+                for gram in _trigrams(field):
+                    self._trigram_postings.setdefault(gram, set()).add(entry_id)
+
+    def __len__(self):
+        return len(self._airports)
+
+    def _candidates(self, query):
+        if len(query) <= _PREFIX_LENGTH:
+            return self._prefixes.get(query, ())
+
+        postings = []
+        for gram in _trigrams(query):
+            posting = self._trigram_postings.get(gram)
+            if not posting:
+                return ()
+            postings.append(posting)
+        postings.sort(key=len)
+        return set.intersection(*postings)
+
+    def _rank(self, query, fields):
+        if fields[0] == query:
+            return EXACT_IATA_MATCH, 0
+        # A match at the start of any word counts as a prefix match
+        for field_rank, field in enumerate(fields):
+            if _starts_word(field, query):
+                return PREFIX_MATCH, field_rank
+        for field_rank, field in enumerate(fields):
+            if query in field:
+                return SUBSTRING_MATCH, field_rank
+        return None
+
+    def search(self, query, limit=10):
+        query = fold(query.strip())
+        if not query or limit <= 0:
+            return []
+
+        ranked = []
+        for entry_id in self._candidates(query):
+            rank = self._rank(query, self._fields[entry_id])
+            # Trigram postings can yield false positives, they are dropped here
+            if rank is not None:
+                ranked.append((rank, self._fields[entry_id][3], entry_id))
+
+        return [self._airports[entry_id] for _, _, entry_id in heapq.nsmallest(limit, ranked)]
@@ -0,0 +1,157 @@
+import argparse
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+from entities.airport import Airport
+from repositories.airport_index import AirportIndex
+
+SNAPSHOT_MAGIC = b'AIRSNAP1'
+_HEADER_LENGTH = struct.Struct('<I')
+_ALIGNMENT = 8
+
+STRING_COLUMNS = ('iata', 'icao', 'name', 'city', 'country')
+# Columns that get a sorted permutation for binary-search lookups by code
+CODE_COLUMNS = ('iata', 'icao')
+
+
+def _string_table(values):
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<u4')
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def build_snapshot(airports, path):
+    airports = list(airports)
+    columns = {
+        'iata': [airport.code for airport in airports],
+        'icao': [airport.icao or '' for airport in airports],
+        'name': [airport.name for airport in airports],
+        'city': [airport.city for airport in airports],
+        'country': [airport.country for airport in airports],
+    }
+
+    arrays = {
+        'latitude': np.array([airport.latitude for airport in airports], dtype='<f8'),
+        'longitude': np.array([airport.longitude for airport in airports], dtype='<f8'),
+    }
+    for column in STRING_COLUMNS:
+        arrays[column + '_offsets'], arrays[column + '_data'] = _string_table(columns[column])
+    for column in CODE_COLUMNS:
+        values = columns[column]
+        order = sorted((position for position, value in enumerate(values) if value), key=values.__getitem__)
+        arrays[column + '_order'] = np.array(order, dtype='<i4')
+
+    # Header: array name -> [offset, dtype, length]; offsets are relative to the data section
+    header = {'count': len(airports), 'arrays': {}}
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = [offset, array.dtype.str, len(array)]
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-(len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(header_bytes)) % _ALIGNMENT)
+
+    # Write next to the target and rename, so workers that still map the old file are unaffected
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'wb') as snapshot_file:
+        snapshot_file.write(SNAPSHOT_MAGIC)
+        snapshot_file.write(_HEADER_LENGTH.pack(len(header_bytes)))
+        snapshot_file.write(header_bytes)
+        for array in arrays.values():
+            snapshot_file.write(array.tobytes())
+            snapshot_file.write(b'\0' * (-array.nbytes % _ALIGNMENT))
+    os.replace(temporary_path, path)
+    return len(airports)
+
+
+class AirportSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self._reload_lock = threading.Lock()
+        self._tables = None
+        self.reload()
+
+    def reload(self):
+        with self._reload_lock:
+            with open(self.path, 'rb') as snapshot_file:
+                # Read-only shared mapping: every process opening the snapshot uses the same page cache
+                mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+            if mapped[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                mapped.close()
+                raise ValueError(f"{self.path} is not an airport snapshot")
+            header_start = len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size
+            header_length, = _HEADER_LENGTH.unpack_from(mapped, len(SNAPSHOT_MAGIC))
+            header = json.loads(mapped[header_start:header_start + header_length])
+            data_start = header_start + header_length
+
+            arrays = {}
+            for name, (offset, dtype, length) in header['arrays'].items():
+                arrays[name] = np.frombuffer(mapped, dtype=dtype, count=length, offset=data_start + offset)
+            self._tables = (header['count'], arrays, mapped)
+        return header['count']
+
+    def _string(self, arrays, column, position):
+        offsets = arrays[column + '_offsets']
+        return arrays[column + '_data'][offsets[position]:offsets[position + 1]].tobytes().decode('utf-8')
+
+    def position(self, code):
+        if not code:
+            return None
+        _, arrays, _ = self._tables
+        code = code.strip().upper()
+        for column in CODE_COLUMNS:
+            order = arrays[column + '_order']
+            index = bisect.bisect_left(order, code, key=lambda position: self._string(arrays, column, position))
+            if index < len(order) and self._string(arrays, column, order[index]) == code:
+                return int(order[index])
+        return None
+
+    def airport_at(self, position):
+        _, arrays, _ = self._tables
+        return Airport(
+            self._string(arrays, 'iata', position),
+            self._string(arrays, 'name', position),
+            self._string(arrays, 'city', position),
+            self._string(arrays, 'country', position),
+            float(arrays['latitude'][position]),
+            float(arrays['longitude'][position]),
+            icao=self._string(arrays, 'icao', position)
+        )
+
+    def get(self, code):
+        position = self.position(code)
+        if position is None:
+            return None
+        return self.airport_at(position)
+
+    def coordinates(self, code):
+        position = self.position(code)
+        if position is None:
+            return None, None
+        _, arrays, _ = self._tables
+        return float(arrays['latitude'][position]), float(arrays['longitude'][position])
+
+    def __len__(self):
+        return self._tables[0]
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.airport_at(position)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build a memory-mappable airport snapshot from OpenFlights airports.dat')
+    parser.add_argument('source', help='URL or local path of airports.dat')
+    parser.add_argument('output', help='Path of the snapshot file to write')
+    args = parser.parse_args()
+
+    count = build_snapshot(AirportIndex(args.source), args.output)
+    print(f"Wrote {count} airports to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import heapq
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+# Nodes with this many airports or fewer are scanned instead of split further
+_LEAF_SIZE = 8
+
+
+def unit_vector(latitude, longitude):
+    latitude = math.radians(latitude)
+    longitude = math.radians(longitude)
+    return (math.cos(latitude) * math.cos(longitude),
+            math.cos(latitude) * math.sin(longitude),
+            math.sin(latitude))
+
+
+def chord_to_km(chord):
+    # Straight-line distance between two points of the unit sphere back to great-circle kilometres
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(distance_km):
+    if distance_km >= math.pi * EARTH_RADIUS_KM:
+        return 2.0
+    return 2 * math.sin(distance_km / (2 * EARTH_RADIUS_KM))
+
+
+def nearby_airport(airport, distance_km):
+    return {
+        'name': airport.name,
+        'city': airport.city,
+        'country': airport.country,
+        'iata': airport.code,
+        'latitude': airport.latitude,
+        'longitude': airport.longitude,
+        'distance_km': round(distance_km, 1)
+    }
+
+
+class AirportSpatialIndex:
+    def __init__(self, airports):
+        # KD-tree over unit-sphere vectors: chord length grows with great-circle distance, so the
+        # nearest airports in 3D are exactly the nearest ones on the globe
+        self._airports = [airport for airport in airports if airport.code]
+        count = len(self._airports)
+        latitudes = np.radians([airport.latitude for airport in self._airports])
+        longitudes = np.radians([airport.longitude for airport in self._airports])
+        vectors = np.column_stack((np.cos(latitudes) * np.cos(longitudes),
+                                   np.cos(latitudes) * np.sin(longitudes),
+                                   np.sin(latitudes))).reshape(count, 3)
+
+        # Implicit tree: node [lo, hi) keeps its median at (lo + hi) // 2, smaller values to the left
+        order = np.arange(count)
+        axes = np.zeros(count, dtype=np.int8)
+        nodes = [(0, count)]
+        while nodes:
+            lo, hi = nodes.pop()
+            if hi - lo <= _LEAF_SIZE:
+                continue
+            block = vectors[order[lo:hi]]
+            axis = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            middle = (lo + hi) // 2
+            order[lo:hi] = order[lo:hi][np.argpartition(block[:, axis], middle - lo)]
+            axes[middle] = axis
+            nodes.append((lo, middle))
+            nodes.append((middle + 1, hi))
+
+        self._order = order.tolist()
+        self._points = vectors[order].tolist()
+        self._axes = axes.tolist()
+
+    def __len__(self):
+        return len(self._airports)
+
+    def _query(self, target, k, max_chord):
+        points = self._points
+        axes = self._axes
+        # Max-heap of the best matches so far as (-squared chord, tree position)
+        best = []
+        radius2 = max_chord * max_chord
+
+        def bound():
+            if k is not None and len(best) == k:
+                return -best[0][0]
+            return radius2
+
+        def consider(position):
+            point = points[position]
+            dx = point[0] - target[0]
+            dy = point[1] - target[1]
+            dz = point[2] - target[2]
+            distance2 = dx * dx + dy * dy + dz * dz
+            if distance2 > bound():
+                return
+            if k is not None and len(best) == k:
+                heapq.heapreplace(best, (-distance2, position))
+            else:
+                heapq.heappush(best, (-distance2, position))
+
+        def visit(lo, hi):
+            if hi - lo <= _LEAF_SIZE:
+                for position in range(lo, hi):
+                    consider(position)
+                return
+            middle = (lo + hi) // 2
+            axis = axes[middle]
+            consider(middle)
+            delta = target[axis] - points[middle][axis]
+            if delta < 0:
+                near, far = (lo, middle), (middle + 1, hi)
+            else:
+                near, far = (middle + 1, hi), (lo, middle)
+            visit(*near)
+            # The other side can only hold closer airports if the splitting plane is within reach
+            if delta * delta <= bound():
+                visit(*far)
+
+        if k != 0:
+            visit(0, len(points))
+        matches = sorted((-negated, position) for negated, position in best)
+        return [(self._airports[self._order[position]], chord_to_km(math.sqrt(distance2)))
+                for distance2, position in matches]
+
+    def nearest(self, latitude, longitude, k=10, radius_km=None):
+        # The k closest airports as (airport, distance_km), optionally no further than radius_km
+        max_chord = float('inf') if radius_km is None else km_to_chord(radius_km)
+        return self._query(unit_vector(latitude, longitude), max(0, k), max_chord)
+
+    def within(self, latitude, longitude, radius_km):
+        # Every airport within radius_km, closest first
+        return self._query(unit_vector(latitude, longitude), None, km_to_chord(radius_km))
@@ -1,26 +1,218 @@
-from interfaces.flight_repository import FlightRepository
+from interfaces.flight_repository import FlightRepository, remaining_time
+import logging
+import threading
+import time
+from urllib.parse import urljoin
 import requests
-import os
+from requests.adapters import HTTPAdapter
+from repositories.json_array_stream import JsonArrayStream
+from repositories.resilience import CircuitBreaker, RetryPolicy, TokenBucket, UpstreamError, retry_after_seconds
+
+AMADEUS_BASE_URL = "https://test.api.amadeus.com"
+# The self-service test environment allows 10 transactions per second
+AMADEUS_RATE_LIMIT = 10
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 20
+# Longest a call waits for the rate limiter before giving up
+RATE_LIMIT_WAIT = 10
+# Bytes of the offers body decoded at a time, and most result pages followed for one search
+OFFERS_CHUNK_SIZE = 64 * 1024
+MAX_OFFER_PAGES = 10
+
+logger = logging.getLogger(__name__)
+
 
 class AmadeusFlightRepository(FlightRepository):
-    def __init__(self, api_key, api_secret):
+    def __init__(self, api_key, api_secret, base_url=AMADEUS_BASE_URL, pool_size=10, token_expiry_margin=60,
+                 rate_limiter=None, retry_policy=None, circuit_breaker=None,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, sleep=time.sleep):
         self.api_key = api_key
         self.api_secret = api_secret
+        self.base_url = base_url.rstrip('/')
+        # Seconds before the announced expiry at which the token is considered stale
+        self.token_expiry_margin = token_expiry_margin
 
-    def get_amadeus_token(self):
-        url = "https://test.api.amadeus.com/v1/security/oauth2/token"
+        # One keep-alive session shared by all requests, so TCP/TLS connections are reused
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = threading.Lock()
+
+        # Pass the same limiter to several repositories to share one quota
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket(AMADEUS_RATE_LIMIT)
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self.timeout = (connect_timeout, read_timeout)
+        self.sleep = sleep
+
+    def _send(self, method, url, **kwargs):
+        # Every call is rate limited, bounded by timeouts, retried with backoff and guarded by the circuit breaker
+        attempt = 0
+        while True:
+            # A caller's deadline (see interfaces.flight_repository.deadline) bounds the quota wait and the read timeout
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise UpstreamError(f"Amadeus {method} {url} abandoned: the search deadline has passed")
+            quota_wait = RATE_LIMIT_WAIT if remaining is None else min(RATE_LIMIT_WAIT, remaining)
+            timeout = self.timeout if remaining is None else (self.timeout[0], min(self.timeout[1], remaining))
+
+            # Fail fast while the circuit is open, before waiting on the limiter
+            self.circuit_breaker.before_call()
+            if not self.rate_limiter.acquire(quota_wait):
+                self.circuit_breaker.record_failure()
+                raise UpstreamError(f"No Amadeus quota available within {quota_wait:.1f}s")
+
+            retry_after = None
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as error:
+                self.circuit_breaker.record_failure()
+                failure = f"{type(error).__name__}: {error}"
+            except requests.RequestException as error:
+                # Not worth retrying (too many redirects, an invalid header...), but it still ends a half-open trial
+                self.circuit_breaker.record_failure()
+                raise UpstreamError(f"Amadeus {method} {url} failed: {type(error).__name__}: {error}") from error
+            except Exception:
+                self.circuit_breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in self.retry_policy.retry_statuses:
+                    self.circuit_breaker.record_success()
+                    self.rate_limiter.recover()
+                    return response
+                retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                # The body is not wanted; closing hands the connection back to the pool before the backoff
+                response.close()
+                if response.status_code == 429:
+                    # Over quota is not an outage: slow down instead of opening the circuit
+                    self.circuit_breaker.record_success()
+                    self.rate_limiter.throttle(retry_after)
+                else:
+                    self.circuit_breaker.record_failure()
+                failure = f"HTTP {response.status_code}"
+
+            attempt += 1
+            self._back_off(method, url, attempt, failure, retry_after)
+
+    def _back_off(self, method, url, attempt, failure, retry_after=None):
+        # Waits before the next attempt, or raises UpstreamError when no attempt or time is left
+        delay = self.retry_policy.delay(attempt - 1, retry_after)
+        if attempt >= self.retry_policy.max_attempts or delay is None:
+            raise UpstreamError(f"Amadeus {method} {url} failed after {attempt} attempts: {failure}")
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            raise UpstreamError(f"Amadeus {method} {url} failed after {attempt} attempts, no time left to retry: {failure}")
+        logger.warning("Amadeus %s %s failed (%s), retrying in %.2fs", method, url, failure, delay)
+        self.sleep(delay)
+
+    def _token_is_valid(self):
+        return self._token is not None and time.monotonic() < self._token_expires_at
+
+    def _request_token(self):
+        url = f"{self.base_url}/v1/security/oauth2/token"
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {
             "grant_type": "client_credentials",
             "client_id": self.api_key,
             "client_secret": self.api_secret
         }
-        response = requests.post(url, headers=headers, data=data)
-        return response.json().get("access_token")
+        response = self._send('POST', url, headers=headers, data=data)
+        return response.json()
+
+    def get_amadeus_token(self):
+        if self._token_is_valid():
+            return self._token
+
+        # Only one thread refreshes; the others wait and reuse its token
+        with self._token_lock:
+            if not self._token_is_valid():
+                token_data = self._request_token()
+                expires_in = float(token_data.get("expires_in", 0))
+                self._token = token_data.get("access_token")
+                self._token_expires_at = time.monotonic() + max(expires_in - self.token_expiry_margin, 0)
+            return self._token
 
-    def get_flight_data(self, origin, destination, departure_date):
+    def invalidate_token(self):
+        with self._token_lock:
+            self._token = None
+            self._token_expires_at = 0
+
+    def _get_offers_page(self, url, params):
+        # The body is left unread so it can be decoded while it arrives; the caller closes the response
         token = self.get_amadeus_token()
-        url = f"https://test.api.amadeus.com/v2/shopping/flight-offers?originLocationCode={origin}&destinationLocationCode={destination}&departureDate={departure_date}&adults=1"
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(url, headers=headers)
-        return response.json()
+        response = self._send('GET', url, headers={"Authorization": f"Bearer {token}"}, params=params, stream=True)
+        if response.status_code == 401:
+            # The token was revoked or expired early: fetch a new one and retry once
+            response.close()
+            self.invalidate_token()
+            token = self.get_amadeus_token()
+            response = self._send('GET', url, headers={"Authorization": f"Bearer {token}"}, params=params, stream=True)
+        return response
+
+    def _iter_offers_page(self, url, params):
+        # Offers of one result page; returns the page's other members. A body that stalls or breaks off
+        # is a failed call like any other: it counts against the circuit breaker, and the page is
+        # requested again as long as none of its offers has been passed on.
+        attempt = 0
+        while True:
+            response = self._get_offers_page(url, params)
+            page = JsonArrayStream(response.iter_content(OFFERS_CHUNK_SIZE))
+            passed_on = False
+            try:
+                for offer in page:
+                    passed_on = True
+                    yield offer
+                return page.document
+            except requests.RequestException as error:
+                self.circuit_breaker.record_failure()
+                failure = f"{type(error).__name__} while reading the response: {error}"
+                if passed_on:
+                    raise UpstreamError(f"Amadeus GET {url} broke off after some offers: {failure}") from error
+            finally:
+                response.close()
+            attempt += 1
+            self._back_off('GET', url, attempt, failure)
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None, max_pages=MAX_OFFER_PAGES):
+        # Yields the offers one by one while the body is read, so memory does not grow with the response size.
+        # Pages announced in meta.links.next are followed; the other members of every page (meta,
+        # dictionaries, errors) are merged into `document` when one is given.
+        url = f"{self.base_url}/v2/shopping/flight-offers"
+        params = {
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": departure_date,
+            "adults": adults
+        }
+        for _ in range(max_pages):
+            page = yield from self._iter_offers_page(url, params)
+            if document is not None:
+                merge_page(document, page)
+
+            next_url = ((page.get('meta') or {}).get('links') or {}).get('next')
+            if not next_url:
+                return
+            # The next link carries the whole query
+            url, params = urljoin(url, next_url), None
+        logger.warning("Stopped following Amadeus offer pages for %s-%s %s after %d pages",
+                       origin, destination, departure_date, max_pages)
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        # Every page in one response-shaped dict, for the caches and callers that need the whole payload
+        flight_data = {}
+        flight_data['data'] = list(self.iter_flight_offers(origin, destination, departure_date, adults, flight_data))
+        return flight_data
+
+
+def merge_page(document, page):
+    for key, value in page.items():
+        if key == 'dictionaries' and isinstance(document.get(key), dict):
+            # Carriers, aircraft and locations seen on any page
+            for section, entries in value.items():
+                document[key].setdefault(section, {}).update(entries)
+        else:
+            document[key] = value
@@ -0,0 +1,98 @@
+from interfaces.flight_repository import FlightRepository
+from collections import OrderedDict
+import threading
+import time
+
+
+class CachedFlightRepository(FlightRepository):
+    def __init__(self, flight_repository, max_entries=256, ttl=300, stale_ttl=1800, clock=time.monotonic):
+        self.flight_repository = flight_repository
+        self.max_entries = max_entries
+        # Entries younger than ttl are fresh; up to ttl + stale_ttl they are served while refreshed in background
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'evictions': 0, 'refreshes': 0, 'refresh_errors': 0}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def _store(self, key, flight_data):
+        # Upstream errors are passed through but never cached
+        if 'errors' in flight_data:
+            return
+        with self._lock:
+            self._entries[key] = (flight_data, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _refresh(self, key):
+        try:
+            self._store(key, self.flight_repository.get_flight_data(*key))
+            with self._lock:
+                self._stats['refreshes'] += 1
+        except Exception:
+            with self._lock:
+                self._stats['refresh_errors'] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _lookup(self, key):
+        # Cached response for the search, or None on a miss
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                flight_data, fetched_at = entry
+                age = self.clock() - fetched_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return flight_data
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key,), daemon=True).start()
+                    return flight_data
+                del self._entries[key]
+            self._stats['misses'] += 1
+        return None
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        key = (origin.upper(), destination.upper(), departure_date, adults)
+        flight_data = self._lookup(key)
+        if flight_data is None:
+            flight_data = self.flight_repository.get_flight_data(*key)
+            self._store(key, flight_data)
+        return flight_data
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None):
+        key = (origin.upper(), destination.upper(), departure_date, adults)
+        flight_data = self._lookup(key)
+        if flight_data is not None:
+            if document is not None:
+                document.update((name, value) for name, value in flight_data.items() if name != 'data')
+            yield from flight_data.get('data', [])
+            return
+
+        # On a miss the offers are passed on as they arrive and cached once the whole response has been read.
+        # The first offer no longer waits for the last, but every offer dict is still kept for the cache entry.
+        page = {}
+        offers = []
+        for offer in self.flight_repository.iter_flight_offers(*key, document=page):
+            offers.append(offer)
+            yield offer
+        if document is not None:
+            document.update(page)
+        self._store(key, dict(page, data=offers))
@@ -0,0 +1,80 @@
+from interfaces.flight_repository import FlightRepository
+import threading
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    # Concurrent calls with the same key wait for one execution and share its result (or exception)
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0}
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._calls
+
+    def do(self, key, function):
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = function()
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            # Forget the key first so calls arriving after completion start a fresh execution
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class CoalescingFlightRepository(FlightRepository):
+    def __init__(self, flight_repository, single_flight=None):
+        self.flight_repository = flight_repository
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+
+    def stats(self):
+        return self.single_flight.stats()
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        key = (origin.upper(), destination.upper(), departure_date, adults)
+        flight_data, _ = self.single_flight.do(
+            key, lambda: self.flight_repository.get_flight_data(origin, destination, departure_date, adults))
+        return flight_data
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None):
+        # A streamed search joins an identical search already in flight. Otherwise it streams straight from the
+        # upstream without making others wait for the whole response: the cache in front absorbs the repeats.
+        key = (origin.upper(), destination.upper(), departure_date, adults)
+        if self.single_flight.in_flight(key):
+            return super().iter_flight_offers(origin, destination, departure_date, adults, document)
+        return self.flight_repository.iter_flight_offers(origin, destination, departure_date, adults, document)
@@ -0,0 +1,87 @@
+import codecs
+import json
+
+_WHITESPACE = ' \t\n\r'
+
+
+class JsonArrayStream:
+    # Yields the elements of one array member of a JSON object (by default "data", as in Amadeus responses)
+    # while the body is still arriving. Only the element being decoded is held in memory; the other members
+    # of the object, e.g. "meta" and "dictionaries", are collected in `document` once iteration is over.
+    def __init__(self, chunks, key='data'):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self.key = key
+        self.document = {}
+        self._buffer = ''
+        self._position = 0
+        self._exhausted = False
+
+    def _read(self):
+        # Appends the next chunk, dropping what has been consumed; False once the body has ended
+        if self._exhausted:
+            return False
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                self._buffer += text
+                return True
+        self._buffer += self._decoder.decode(b'', final=True)
+        self._exhausted = True
+        return False
+
+    def _next_char(self):
+        # Skips whitespace and returns the next character without consuming it, or '' at the end of the body
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in _WHITESPACE:
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                return ''
+
+    def _expect(self, characters):
+        char = self._next_char()
+        if char == '' or char not in characters:
+            raise ValueError(f"Expected one of {characters!r} in JSON stream, got {char or 'end of body'!r}")
+        self._position += 1
+        return char
+
+    def _value(self):
+        self._next_char()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._position)
+                # A number or literal at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._exhausted:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError:
+                if self._exhausted:
+                    raise
+            self._read()
+
+    def __iter__(self):
+        self._expect('{')
+        if self._next_char() == '}':
+            self._position += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            if key == self.key and self._next_char() == '[':
+                self._position += 1
+                if self._next_char() == ']':
+                    self._position += 1
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(',]') == ']':
+                            break
+            else:
+                self.document[key] = self._value()
+            if self._expect(',}') == '}':
+                return
@@ -0,0 +1,36 @@
+from interfaces.flight_repository import FlightRepository
+from repositories.json_array_stream import JsonArrayStream
+import json
+import os
+
+CHUNK_SIZE = 64 * 1024
+
+
+class LocalFileFlightRepository(FlightRepository):
+    # Amadeus responses saved on disk, one file per search named ORIGIN-DESTINATION-DATE.json
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path_for(self, origin, destination, departure_date):
+        return os.path.join(self.directory, f"{origin.upper()}-{destination.upper()}-{departure_date}.json")
+
+    def save(self, origin, destination, departure_date, flight_data):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path_for(origin, destination, departure_date), 'w', encoding='utf-8') as offers_file:
+            json.dump(flight_data, offers_file)
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        try:
+            with open(self.path_for(origin, destination, departure_date), encoding='utf-8') as offers_file:
+                return json.load(offers_file)
+        except FileNotFoundError:
+            return {'data': []}
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None):
+        # Offers decoded one at a time while the file is read. Unlike get_flight_data, a search
+        # with no saved file raises FileNotFoundError so callers can tell it from an empty result.
+        with open(self.path_for(origin, destination, departure_date), 'rb') as offers_file:
+            stream = JsonArrayStream(iter(lambda: offers_file.read(CHUNK_SIZE), b''))
+            yield from stream
+        if document is not None:
+            document.update(stream.document)
@@ -1,43 +1,78 @@
+import threading
 from interfaces.aiport_repository import AirportRepository
-import requests
+from repositories.airport_index import AirportIndex, OPENFLIGHTS_AIRPORTS_URL
+from repositories.airport_search_index import AirportSearchIndex
+from repositories.airport_spatial_index import AirportSpatialIndex, nearby_airport
+from repositories.airport_snapshot import AirportSnapshot
 
 
 class OpenFlightsAirportRepository(AirportRepository):
-    def __init__(self):
-        self.airports_url = 'https://raw.githubusercontent.com/jpatokal/openflights/master/data/airports.dat'
+    def __init__(self, airports_source=OPENFLIGHTS_AIRPORTS_URL, index=None):
+        self.airports_url = airports_source
+        # The airports file is downloaded (or read from disk) once and kept in memory
+        self.index = index if index is not None else AirportIndex(airports_source)
+        self._search_index = None
+        self._spatial_index = None
+        self._search_index_lock = threading.Lock()
+
+    @classmethod
+    def from_snapshot(cls, snapshot_path):
+        # Airports come from a prebuilt binary snapshot mapped into memory instead of airports.dat
+        return cls(snapshot_path, index=AirportSnapshot(snapshot_path))
+
+    def warm_up(self):
+        # Build the lookup, autocomplete and nearby indexes before the first request arrives
+        self._get_spatial_index()
+        return len(self._get_search_index())
+
+    def reload(self):
+        count = self.index.reload()
+        # Only the indexes already in use are rebuilt; the others stay lazy
+        with self._search_index_lock:
+            if self._search_index is not None:
+                self._search_index = AirportSearchIndex(self.index)
+            if self._spatial_index is not None:
+                self._spatial_index = AirportSpatialIndex(self.index)
+        return count
+
+    def _get_search_index(self):
+        if self._search_index is None:
+            with self._search_index_lock:
+                if self._search_index is None:
+                    self._search_index = AirportSearchIndex(self.index)
+        return self._search_index
+
+    def _get_spatial_index(self):
+        if self._spatial_index is None:
+            with self._search_index_lock:
+                if self._spatial_index is None:
+                    self._spatial_index = AirportSpatialIndex(self.index)
+        return self._spatial_index
+
+    def get_airport(self, code):
+        return self.index.get(code)
 
     def get_airport_coordinates(self, iata_code):
-        response = requests.get(self.airports_url)
-        airports_data = response.text.splitlines()
-
-        for airport in airports_data:
-            fields = airport.split(',')
-            if fields[4].strip('"') == iata_code:
-                lat = float(fields[6])
-                lon = float(fields[7])
-                return lat, lon
-        return None, None
-
-    # Nueva función para buscar aeropuertos por ciudad o país
-    def search_airports(self, query):
-        response = requests.get(self.airports_url)
-        airports_data = response.text.splitlines()
+        return self.index.coordinates(iata_code)
 
+    # Busca aeropuertos por código IATA, ciudad, país o nombre, ordenados por relevancia
+    def search_airports(self, query, limit=10):
         results = []
-        for airport in airports_data:
-            fields = airport.split(',')
-            city = fields[2].strip('"').lower()
-            country = fields[3].strip('"').lower()
-            name = fields[1].strip('"')
-            iata_code = fields[4].strip('"')
-
-            # Filtrar por ciudad o país
-            if query.lower() in city or query.lower() in country:
-                results.append({
-                    'name': name,
-                    'city': city.capitalize(),
-                    'country': country.capitalize(),
-                    'iata': iata_code
-                })
+        for airport in self._get_search_index().search(query, limit):
+            results.append({
+                'name': airport.name,
+                'city': airport.city,
+                'country': airport.country,
+                'iata': airport.code
+            })
 
         return results
+
+    # Aeropuertos más cercanos a unas coordenadas, con la distancia en kilómetros
+    def nearest_airports(self, latitude, longitude, k=10, radius_km=None):
+        return [nearby_airport(airport, distance_km)
+                for airport, distance_km in self._get_spatial_index().nearest(latitude, longitude, k, radius_km)]
+
+    def airports_within(self, latitude, longitude, radius_km):
+        return [nearby_airport(airport, distance_km)
+                for airport, distance_km in self._get_spatial_index().within(latitude, longitude, radius_km)]
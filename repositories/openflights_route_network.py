@@ -0,0 +1,137 @@
+import csv
+import numpy as np
+
+OPENFLIGHTS_ROUTES_URL = 'https://raw.githubusercontent.com/jpatokal/openflights/master/data/routes.dat'
+EARTH_RADIUS_KM = 6371.0
+
+
+def _csr(sources, targets, airport_count):
+    # Compressed sparse rows: neighbours of airport i are indices[indptr[i]:indptr[i + 1]], sorted
+    order = np.lexsort((targets, sources))
+    sources, targets = sources[order], targets[order]
+    indptr = np.zeros(airport_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=airport_count), out=indptr[1:])
+    return indptr, targets.astype(np.int32)
+
+
+class RouteNetwork:
+    def __init__(self, airport_index, routes_path):
+        # Airport ids are positions in the airport index, so both share one numbering
+        self.airport_index = airport_index
+        self.routes_path = routes_path
+        self.reload()
+
+    def reload(self):
+        edges = set()
+        with open(self.routes_path, encoding='utf-8', newline='') as routes_file:
+            for fields in csv.reader(routes_file):
+                # Only non-stop services are edges of the network
+                if len(fields) < 8 or fields[7].strip() != '0':
+                    continue
+                source = self.airport_index.position(fields[2])
+                target = self.airport_index.position(fields[4])
+                if source is not None and target is not None and source != target:
+                    edges.add((source, target))
+
+        airport_count = len(self.airport_index)
+        pairs = np.array(sorted(edges), dtype=np.int64).reshape(-1, 2)
+        self.outgoing = _csr(pairs[:, 0], pairs[:, 1], airport_count)
+        self.incoming = _csr(pairs[:, 1], pairs[:, 0], airport_count)
+
+        airports = list(self.airport_index)
+        latitudes = np.radians([airport.latitude for airport in airports])
+        longitudes = np.radians([airport.longitude for airport in airports])
+        self._vectors = np.column_stack((np.cos(latitudes) * np.cos(longitudes),
+                                         np.cos(latitudes) * np.sin(longitudes),
+                                         np.sin(latitudes)))
+        self._codes = [airport.code or airport.icao for airport in airports]
+        return len(edges)
+
+    @property
+    def edge_count(self):
+        return len(self.outgoing[1])
+
+    def _neighbours(self, csr, airport_id):
+        indptr, indices = csr
+        return indices[indptr[airport_id]:indptr[airport_id + 1]]
+
+    def destinations_from(self, code):
+        airport_id = self.airport_index.position(code)
+        if airport_id is None:
+            return []
+        return [self._codes[neighbour] for neighbour in self._neighbours(self.outgoing, airport_id)]
+
+    def _distances_km(self, paths):
+        # Great-circle length of each path (rows of airport ids, same number of legs)
+        vectors = self._vectors[paths]
+        dots = np.clip(np.einsum('ijk,ijk->ij', vectors[:, :-1], vectors[:, 1:]), -1.0, 1.0)
+        return (np.arccos(dots) * EARTH_RADIUS_KM).sum(axis=1)
+
+    def connections(self, origin, destination, max_stops=2, limit=20):
+        # Direct, one-stop and two-stop paths, shortest great-circle distance first
+        origin_id = self.airport_index.position(origin)
+        destination_id = self.airport_index.position(destination)
+        if origin_id is None or destination_id is None or origin_id == destination_id:
+            return []
+
+        from_origin = self._neighbours(self.outgoing, origin_id)
+        to_destination = self._neighbours(self.incoming, destination_id)
+        candidates = []
+
+        position = np.searchsorted(from_origin, destination_id)
+        if position < len(from_origin) and from_origin[position] == destination_id:
+            candidates.append(np.array([[origin_id, destination_id]]))
+
+        if max_stops >= 1:
+            hubs = np.intersect1d(from_origin, to_destination, assume_unique=True)
+            if len(hubs):
+                candidates.append(np.column_stack((np.full(len(hubs), origin_id), hubs, np.full(len(hubs), destination_id))))
+
+        if max_stops >= 2 and len(from_origin) and len(to_destination):
+            # Expand every first hop at once, then keep second hops that reach the destination
+            indptr, indices = self.outgoing
+            starts, ends = indptr[from_origin], indptr[from_origin + 1]
+            lengths = ends - starts
+            first_hubs = np.repeat(from_origin, lengths)
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            second_hubs = indices[np.repeat(starts, lengths) + offsets]
+            keep = (np.isin(second_hubs, to_destination, assume_unique=False)
+                    & (second_hubs != origin_id) & (first_hubs != destination_id) & (second_hubs != first_hubs))
+            if keep.any():
+                count = int(keep.sum())
+                candidates.append(np.column_stack((np.full(count, origin_id), first_hubs[keep],
+                                                   second_hubs[keep], np.full(count, destination_id))))
+
+        if not candidates:
+            return []
+        distances = [self._distances_km(group) for group in candidates]
+        all_distances = np.concatenate(distances)
+        # Fewer legs first among equally long paths; only the selected rows are turned into codes
+        legs = np.concatenate([np.full(len(group), group.shape[1]) for group in candidates])
+        order = np.lexsort((legs, all_distances))
+        if limit is not None:
+            order = order[:limit]
+        group_starts = np.cumsum([0] + [len(group) for group in candidates])
+
+        connections = []
+        for position in order:
+            group_index = int(np.searchsorted(group_starts, position, side='right')) - 1
+            row = candidates[group_index][position - group_starts[group_index]]
+            connections.append({
+                'airports': [self._codes[airport_id] for airport_id in row],
+                'distance_km': round(float(all_distances[position]), 1)
+            })
+        return connections
+
+
+def promising_legs(connections):
+    # Distinct legs of the given paths, in order of first appearance, ready to be searched upstream
+    legs = []
+    seen = set()
+    for connection in connections:
+        airports = connection['airports']
+        for leg in zip(airports, airports[1:]):
+            if leg not in seen:
+                seen.add(leg)
+                legs.append(leg)
+    return legs
@@ -0,0 +1,133 @@
+import random
+import threading
+import time
+
+# Responses worth retrying: quota exhausted or the upstream failing on its side
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class UpstreamError(Exception):
+    pass
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+def retry_after_seconds(value):
+    # Retry-After in seconds; the HTTP-date form is not used by Amadeus
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    # Client-side rate limit shared by every thread using the same repository.
+    # The rate halves whenever the upstream answers 429 and climbs back a tenth at a time on success.
+    def __init__(self, rate, capacity=None, min_rate=None, clock=time.monotonic, sleep=time.sleep):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = min_rate if min_rate is not None else self.max_rate / 10
+        self.capacity = capacity if capacity is not None else max(1.0, self.max_rate)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        # Waits for a token; False if none is available within timeout seconds
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                return False
+            self.sleep(wait)
+
+    def throttle(self, retry_after=None):
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def recover(self):
+        if self.rate < self.max_rate:
+            with self._lock:
+                self._refill(self.clock())
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0, retry_statuses=RETRY_STATUSES, random=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+        self.random = random
+
+    def delay(self, attempt, retry_after=None):
+        # Full jitter: anywhere up to the exponential cap, so clients that failed together retry apart.
+        # None when the upstream asks for a longer pause than we are willing to hold a worker for.
+        if retry_after is not None and retry_after > self.max_delay:
+            return None
+        delay = self.random() * min(self.max_delay, self.base_delay * 2 ** attempt)
+        return max(delay, retry_after or 0)
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive failures and fails fast for reset_timeout seconds,
+    # then lets a single trial call through to decide whether to close again
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - self.clock()
+                if remaining > 0:
+                    raise CircuitOpenError(f"Upstream unavailable, retrying in {remaining:.0f}s")
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    raise CircuitOpenError("Upstream unavailable, a trial call is running")
+                self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = self.clock()
+            self._trial_running = False
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+
+class SearchStore:
+    # Results of recent searches kept under a search id, least recently used dropped first
+    def __init__(self, max_entries=128, ttl=900, clock=time.monotonic):
+        self.max_entries = max_entries
+        # Seconds after the last access at which a search is forgotten
+        self.ttl = ttl
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'stored': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    def put(self, value):
+        search_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[search_id] = (value, self.clock())
+            self._stats['stored'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+        return search_id
+
+    def get(self, search_id):
+        with self._lock:
+            entry = self._entries.get(search_id)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            value, used_at = entry
+            now = self.clock()
+            if now - used_at >= self.ttl:
+                del self._entries[search_id]
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+            self._entries[search_id] = (value, now)
+            self._entries.move_to_end(search_id)
+            self._stats['hits'] += 1
+            return value
@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+from entities.airport import Airport
+from interfaces.aiport_repository import AirportRepository
+from repositories.airport_spatial_index import AirportSpatialIndex, nearby_airport
+from repositories.sqlite_connection import SqliteConnections
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS airports (
+    position INTEGER PRIMARY KEY,
+    iata TEXT NOT NULL,
+    icao TEXT NOT NULL,
+    name TEXT NOT NULL,
+    city TEXT NOT NULL,
+    country TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS airports_iata ON airports (iata);
+CREATE INDEX IF NOT EXISTS airports_icao ON airports (icao);
+CREATE INDEX IF NOT EXISTS airports_city ON airports (city COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS airports_country ON airports (country COLLATE NOCASE);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS airports_fts USING fts5(
+    name, city, country, iata, content='airports', content_rowid='position', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _airport(row):
+    return Airport(row['iata'], row['name'], row['city'], row['country'], row['latitude'], row['longitude'], icao=row['icao'])
+
+
+class SqliteAirportRepository(AirportRepository):
+    def __init__(self, database_path, batch_size=1000):
+        self.connections = SqliteConnections(database_path)
+        self.batch_size = batch_size
+        # Built from the table on first use; SQLite has no cheap nearest-neighbour query
+        self._spatial_index = None
+        self._spatial_index_lock = threading.Lock()
+        connection = self.connections.get()
+        with connection:
+            connection.executescript(_SCHEMA)
+            try:
+                connection.executescript(_FTS_SCHEMA)
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: name search falls back to LIKE
+                self.has_fts = False
+
+    def close(self):
+        self.connections.close()
+
+    def __len__(self):
+        return self.connections.get().execute('SELECT COUNT(*) FROM airports').fetchone()[0]
+
+    def import_airports(self, airports):
+        rows = [(position, airport.code, airport.icao or '', airport.name, airport.city, airport.country,
+                 airport.latitude, airport.longitude) for position, airport in enumerate(airports)]
+        connection = self.connections.get()
+        # A single transaction, written in batches, replaces the whole table
+        with connection:
+            connection.execute('DELETE FROM airports')
+            for start in range(0, len(rows), self.batch_size):
+                connection.executemany('INSERT INTO airports VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows[start:start + self.batch_size])
+            if self.has_fts:
+                connection.execute("INSERT INTO airports_fts (airports_fts) VALUES ('rebuild')")
+        self._spatial_index = None
+        return len(rows)
+
+    def get_airport(self, code):
+        if not code:
+            return None
+        code = code.strip().upper()
+        connection = self.connections.get()
+        row = connection.execute('SELECT * FROM airports WHERE iata = ? ORDER BY position LIMIT 1', (code,)).fetchone()
+        if row is None:
+            row = connection.execute('SELECT * FROM airports WHERE icao = ? ORDER BY position LIMIT 1', (code,)).fetchone()
+        return _airport(row) if row is not None else None
+
+    def get_airport_coordinates(self, iata_code):
+        airport = self.get_airport(iata_code)
+        if airport is None:
+            return None, None
+        return airport.latitude, airport.longitude
+
+    def _search_rows(self, query, limit):
+        connection = self.connections.get()
+        rows = list(connection.execute(
+            "SELECT * FROM airports WHERE iata = ? LIMIT 1", (query.upper(),)))
+        remaining = limit - len(rows)
+        if remaining <= 0:
+            return rows
+        seen = [row['position'] for row in rows] or [-1]
+
+        if self.has_fts:
+            # Every word of the query as a prefix term, best bm25 rank first
+            terms = ' '.join('"{}"*'.format(word.replace('"', '""')) for word in query.split())
+            rows += connection.execute(
+                'SELECT airports.* FROM airports_fts JOIN airports ON airports.position = airports_fts.rowid '
+                "WHERE airports_fts MATCH ? AND airports.iata != '' AND airports.position NOT IN ({}) "
+                'ORDER BY airports_fts.rank LIMIT ?'.format(','.join('?' * len(seen))),
+                [terms, *seen, remaining]).fetchall()
+        else:
+            pattern = '%' + query.replace('%', '').replace('_', '') + '%'
+            rows += connection.execute(
+                "SELECT * FROM airports WHERE iata != '' AND position NOT IN ({}) "
+                'AND (city LIKE ? OR country LIKE ? OR name LIKE ?) ORDER BY name LIMIT ?'.format(','.join('?' * len(seen))),
+                [*seen, pattern, pattern, pattern, remaining]).fetchall()
+        return rows
+
+    def search_airports(self, query, limit=10):
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+
+        results = []
+        for row in self._search_rows(query, limit):
+            results.append({
+                'name': row['name'],
+                'city': row['city'],
+                'country': row['country'],
+                'iata': row['iata']
+            })
+        return results
+
+    def _get_spatial_index(self):
+        if self._spatial_index is None:
+            with self._spatial_index_lock:
+                if self._spatial_index is None:
+                    rows = self.connections.get().execute("SELECT * FROM airports WHERE iata != '' ORDER BY position")
+                    self._spatial_index = AirportSpatialIndex(_airport(row) for row in rows)
+        return self._spatial_index
+
+    def nearest_airports(self, latitude, longitude, k=10, radius_km=None):
+        return [nearby_airport(airport, distance_km)
+                for airport, distance_km in self._get_spatial_index().nearest(latitude, longitude, k, radius_km)]
+
+    def airports_within(self, latitude, longitude, radius_km):
+        return [nearby_airport(airport, distance_km)
+                for airport, distance_km in self._get_spatial_index().within(latitude, longitude, radius_km)]
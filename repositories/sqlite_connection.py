@@ -0,0 +1,31 @@
+import sqlite3
+import threading
+
+
+class SqliteConnections:
+    # One connection per thread; WAL lets every worker on the host read while one of them writes
+    def __init__(self, database_path, busy_timeout=5.0):
+        self.database_path = database_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.database_path, timeout=self.busy_timeout, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            with self._lock:
+                self._opened.append(connection)
+        return connection
+
+    def close(self):
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for connection in opened:
+            connection.close()
+        self._local = threading.local()
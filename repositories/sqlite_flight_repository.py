@@ -0,0 +1,137 @@
+from interfaces.flight_repository import FlightRepository
+from repositories.sqlite_connection import SqliteConnections
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    adults INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (origin, destination, departure_date, adults)
+);
+CREATE INDEX IF NOT EXISTS offers_expires_at ON offers (expires_at);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+class SqliteFlightRepository(FlightRepository):
+    def __init__(self, flight_repository, database_path, ttl=900, batch_size=20, flush_interval=5.0, clock=time.time):
+        self.flight_repository = flight_repository
+        self.connections = SqliteConnections(database_path)
+        self.ttl = ttl
+        # Fetched offers are buffered and written in one transaction per batch, at the latest
+        # flush_interval seconds later; call close() on shutdown to write what is left
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Wall-clock time, because expiry is shared with other processes through the database
+        self.clock = clock
+
+        self._pending = {}
+        self._pending_since = None
+        self._pending_lock = threading.Lock()
+        connection = self.connections.get()
+        with connection:
+            connection.executescript(_SCHEMA)
+
+        # Writes the buffer even when no further search comes in to trigger a flush
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception("Could not write buffered offers")
+
+    def close(self):
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        self.connections.close()
+
+    def _read(self, key):
+        row = self.connections.get().execute(
+            'SELECT payload FROM offers WHERE origin = ? AND destination = ? AND departure_date = ? AND adults = ? '
+            'AND expires_at > ?', (*key, self.clock())).fetchone()
+        return json.loads(row['payload']) if row is not None else None
+
+    def flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._pending_since = None
+        if not pending:
+            return 0
+        connection = self.connections.get()
+        with connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO offers VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(*key, payload, fetched_at, fetched_at + self.ttl) for key, (payload, fetched_at) in pending.items()])
+        return len(pending)
+
+    def purge_expired(self):
+        connection = self.connections.get()
+        with connection:
+            return connection.execute('DELETE FROM offers WHERE expires_at <= ?', (self.clock(),)).rowcount
+
+    def _lookup(self, key):
+        with self._pending_lock:
+            pending = self._pending.get(key)
+        if pending is not None and pending[1] + self.ttl > self.clock():
+            return json.loads(pending[0])
+        return self._read(key)
+
+    def _buffer(self, key, payload):
+        now = self.clock()
+        with self._pending_lock:
+            self._pending[key] = (payload, now)
+            if self._pending_since is None:
+                self._pending_since = now
+            should_flush = len(self._pending) >= self.batch_size or now - self._pending_since >= self.flush_interval
+        if should_flush:
+            self.flush()
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        key = (origin.upper(), destination.upper(), departure_date, adults)
+        flight_data = self._lookup(key)
+        if flight_data is not None:
+            return flight_data
+
+        flight_data = self.flight_repository.get_flight_data(*key)
+        # Upstream errors are passed through but never stored
+        if 'errors' not in flight_data:
+            self._buffer(key, json.dumps(flight_data))
+        return flight_data
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None):
+        key = (origin.upper(), destination.upper(), departure_date, adults)
+        flight_data = self._lookup(key)
+        if flight_data is not None:
+            if document is not None:
+                document.update((name, value) for name, value in flight_data.items() if name != 'data')
+            yield from flight_data.get('data', [])
+            return
+
+        # On a miss the offers are passed on as they arrive; only their JSON text is kept until the
+        # response has been read and can be stored
+        page = {}
+        offers = []
+        for offer in self.flight_repository.iter_flight_offers(*key, document=page):
+            offers.append(json.dumps(offer))
+            yield offer
+        if document is not None:
+            document.update(page)
+        if 'errors' not in page:
+            # The same text json.dumps would give for the whole response
+            members = ', ' + json.dumps(page)[1:] if page else '}'
+            self._buffer(key, '{"data": [' + ', '.join(offers) + ']' + members)
@@ -0,0 +1,112 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class AmadeusStandIn:
+    """Local stand-in for the Amadeus token and flight-offers endpoints."""
+
+    def __init__(self, offers=None, expires_in=1799, latency=0, retry_after=None, pages=None):
+        self.offers = offers if offers is not None else {'data': []}
+        # Responses served one after another through meta.links.next, instead of `offers`
+        self.pages = pages
+        self.expires_in = expires_in
+        # Seconds every flight-offers response is delayed by
+        self.latency = latency
+        # Retry-After header sent with injected 429 responses
+        self.retry_after = retry_after
+        self.failures = deque()
+        # Bytes of the body sent by the next 200 responses before they stall until the client gives up
+        self.stalls = deque()
+        self.token_requests = 0
+        self.offer_requests = []
+        self.revoked_tokens = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def fail_next(self, *statuses):
+        # The next flight-offers requests are answered with these status codes, in order
+        self.failures.extend(statuses)
+
+    def stall_next(self, *after_bytes):
+        # The next successful flight-offers responses send their headers and this many body bytes, then hang
+        self.stalls.extend(after_bytes)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=(), stall_after=None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if stall_after is None:
+                    self.wfile.write(body)
+                    return
+                self.wfile.write(body[:stall_after])
+                self.wfile.flush()
+                time.sleep(1)
+                self.close_connection = True
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with standin._lock:
+                    standin.token_requests += 1
+                    token = f"token-{standin.token_requests}"
+                self._send_json(200, {'access_token': token, 'expires_in': standin.expires_in})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                token = self.headers.get('Authorization', '').replace('Bearer ', '')
+                if not token.startswith('token-') or token in standin.revoked_tokens:
+                    self._send_json(401, {'errors': [{'status': 401}]})
+                    return
+                with standin._lock:
+                    standin.offer_requests.append({key: values[0] for key, values in parse_qs(url.query).items()})
+                    status = standin.failures.popleft() if standin.failures else 200
+                    stall_after = standin.stalls.popleft() if status == 200 and standin.stalls else None
+                if standin.latency:
+                    time.sleep(standin.latency)
+                if status != 200:
+                    headers = [('Retry-After', str(standin.retry_after))] if status == 429 and standin.retry_after is not None else []
+                    self._send_json(status, {'errors': [{'status': status}]}, headers)
+                    return
+                if standin.pages is None:
+                    self._send_json(200, standin.offers, stall_after=stall_after)
+                    return
+                query = parse_qs(url.query)
+                page = int(query.pop('page', ['0'])[0])
+                payload = dict(standin.pages[page])
+                if page + 1 < len(standin.pages):
+                    query['page'] = [str(page + 1)]
+                    payload['meta'] = {'count': len(payload.get('data', [])),
+                                       'links': {'next': f"{url.path}?{urlencode(query, doseq=True)}"}}
+                self._send_json(200, payload, stall_after=stall_after)
+
+        return Handler
@@ -0,0 +1,173 @@
+import math
+import os
+import random
+import pytest
+from repositories.airport_index import AirportIndex
+from repositories.airport_search_index import AirportSearchIndex
+from repositories.airport_spatial_index import AirportSpatialIndex
+from repositories.airport_snapshot import AirportSnapshot, build_snapshot
+from repositories.openflights_airport_repository import OpenFlightsAirportRepository
+from repositories.sqlite_airport_repository import SqliteAirportRepository
+
+AIRPORTS_SAMPLE = os.path.join(os.path.dirname(__file__), 'data', 'airports_sample.dat')
+
+
+def test_index_looks_up_iata_and_icao_codes():
+    index = AirportIndex(AIRPORTS_SAMPLE)
+
+    assert index.coordinates('MAD') == (40.471926, -3.56264)
+    assert index.get('egll').code == 'LHR'
+    assert index.coordinates('XXX') == (None, None)
+
+
+def test_index_parses_quoted_fields_with_commas():
+    index = AirportIndex(AIRPORTS_SAMPLE)
+
+    airport = index.get('LECU')
+    assert airport.name == 'Madrid, Cuatro Vientos Airport'
+    assert airport.code == ''
+    assert (airport.latitude, airport.longitude) == (40.370701, -3.78514)
+
+
+def test_index_is_loaded_once_and_can_be_reloaded(tmp_path):
+    airports_file = tmp_path / 'airports.dat'
+    airports_file.write_text(open(AIRPORTS_SAMPLE, encoding='utf-8').read(), encoding='utf-8')
+    index = AirportIndex(str(airports_file))
+    assert index.get('JFK') is not None
+
+    airports_file.write_text('1,"Test Airport","Testville","Nowhere","TST","XTST",1.5,2.5\n', encoding='utf-8')
+    assert index.get('JFK') is not None
+
+    assert index.reload() == 1
+    assert index.get('JFK') is None
+    assert index.coordinates('TST') == (1.5, 2.5)
+
+
+def test_repository_searches_by_city_or_country():
+    repository = OpenFlightsAirportRepository(AIRPORTS_SAMPLE)
+
+    codes = {airport['iata'] for airport in repository.search_airports('paris')}
+    assert codes == {'CDG', 'ORY'}
+
+
+def test_search_ranks_exact_iata_then_prefix_then_substring():
+    index = AirportSearchIndex(AirportIndex(AIRPORTS_SAMPLE))
+
+    codes = [airport.code for airport in index.search('lax', limit=5)]
+    assert codes == ['LAX']
+
+    # Every London airport starts with "lon", Barcelona only contains it
+    codes = [airport.code for airport in index.search('lon', limit=10)]
+    assert set(codes[:5]) == {'LHR', 'LGW', 'STN', 'LCY', 'YXU'}
+    assert codes[5:] == ['BCN']
+
+    # "cdg" is an exact code, "charles" a prefix of a name
+    assert index.search('CDG')[0].code == 'CDG'
+    assert [airport.code for airport in index.search('orly')] == ['ORY']
+
+
+def test_search_prefers_prefix_over_substring_matches_and_honours_limit():
+    index = AirportSearchIndex(AirportIndex(AIRPORTS_SAMPLE))
+
+    # "ma" starts Madrid's city and a word of Frankfurt's name, but only appears inside "Germany"
+    results = index.search('ma', limit=20)
+    assert [airport.code for airport in results] == ['MAD', 'FRA']
+
+    assert [airport.code for airport in index.search('ster')] == ['AMS']
+    assert len(index.search('l', limit=2)) == 2
+    assert index.search('suarez')[0].code == 'MAD'
+    assert index.search('zzz') == []
+
+
+def test_snapshot_round_trips_the_index(tmp_path):
+    index = AirportIndex(AIRPORTS_SAMPLE)
+    snapshot_path = str(tmp_path / 'airports.snap')
+    assert build_snapshot(index, snapshot_path) == len(index)
+
+    snapshot = AirportSnapshot(snapshot_path)
+    assert len(snapshot) == len(index)
+    assert snapshot.coordinates('JFK') == index.coordinates('JFK')
+    assert snapshot.get('lemd').name == 'Adolfo Suárez Madrid–Barajas Airport'
+    assert snapshot.get('LECU').name == 'Madrid, Cuatro Vientos Airport'
+    assert snapshot.coordinates('XXX') == (None, None)
+    assert [airport.code for airport in snapshot] == [airport.code for airport in index]
+
+
+def test_repository_opens_snapshot(tmp_path):
+    snapshot_path = str(tmp_path / 'airports.snap')
+    build_snapshot(AirportIndex(AIRPORTS_SAMPLE), snapshot_path)
+
+    repository = OpenFlightsAirportRepository.from_snapshot(snapshot_path)
+    assert repository.get_airport_coordinates('CDG') == (49.012798, 2.55)
+    # Lookups read the mapping; the per-worker indexes are only built once a search needs them
+    repository.reload()
+    assert repository._search_index is None and repository._spatial_index is None
+    assert repository.search_airports('orly')[0]['iata'] == 'ORY'
+    assert repository._spatial_index is None
+
+
+def test_sqlite_airport_repository_imports_and_searches(tmp_path):
+    repository = SqliteAirportRepository(str(tmp_path / 'airports.db'))
+    assert repository.import_airports(AirportIndex(AIRPORTS_SAMPLE)) == 14
+
+    assert repository.get_airport_coordinates('JFK') == (40.63980103, -73.77890015)
+    assert repository.get_airport('LECU').name == 'Madrid, Cuatro Vientos Airport'
+    assert repository.get_airport_coordinates('XXX') == (None, None)
+
+    assert repository.search_airports('cdg')[0]['iata'] == 'CDG'
+    assert {airport['iata'] for airport in repository.search_airports('paris')} == {'CDG', 'ORY'}
+    assert repository.search_airports('suarez')[0]['iata'] == 'MAD'
+    assert len(repository.search_airports('lon', limit=3)) == 3
+
+    # Another process opening the same file sees the imported data
+    reopened = SqliteAirportRepository(str(tmp_path / 'airports.db'))
+    assert len(reopened) == 14
+    repository.close()
+    reopened.close()
+
+
+def haversine_km(latitude, longitude, airport):
+    phi1, phi2 = math.radians(latitude), math.radians(airport.latitude)
+    delta_lambda = math.radians(airport.longitude - longitude)
+    h = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def test_repository_finds_nearest_airports():
+    repository = OpenFlightsAirportRepository(AIRPORTS_SAMPLE)
+
+    # Puerta del Sol: Barajas first, Cuatro Vientos has no IATA code and is left out
+    nearest = repository.nearest_airports(40.4169, -3.7035, k=2)
+    assert [airport['iata'] for airport in nearest] == ['MAD', 'BCN']
+    assert nearest[0]['distance_km'] == 13.4
+
+    london = repository.airports_within(51.5072, -0.1276, 60)
+    assert {airport['iata'] for airport in london} == {'LHR', 'LGW', 'STN', 'LCY'}
+    assert london[0]['iata'] == 'LCY'
+    assert repository.nearest_airports(51.5072, -0.1276, k=10, radius_km=30)[-1]['iata'] == 'LHR'
+
+
+def test_spatial_index_matches_brute_force_haversine():
+    random_airports = random.Random(5)
+    index = AirportIndex(AIRPORTS_SAMPLE)
+    airports = [airport for airport in index if airport.code]
+    spatial_index = AirportSpatialIndex(index)
+
+    for _ in range(50):
+        latitude, longitude = random_airports.uniform(-90, 90), random_airports.uniform(-180, 180)
+        expected = sorted(airports, key=lambda airport: haversine_km(latitude, longitude, airport))
+        nearest = spatial_index.nearest(latitude, longitude, k=5)
+        assert [airport for airport, _ in nearest] == expected[:5]
+        assert nearest[0][1] == pytest.approx(haversine_km(latitude, longitude, expected[0]))
+
+        radius_km = random_airports.uniform(0, 8000)
+        within = {airport.code for airport, _ in spatial_index.within(latitude, longitude, radius_km)}
+        assert within == {airport.code for airport in airports if haversine_km(latitude, longitude, airport) <= radius_km}
+
+
+def test_sqlite_airport_repository_finds_nearest_airports(tmp_path):
+    repository = SqliteAirportRepository(str(tmp_path / 'airports.db'))
+    repository.import_airports(AirportIndex(AIRPORTS_SAMPLE))
+
+    assert [airport['iata'] for airport in repository.nearest_airports(48.8566, 2.3522, k=2)] == ['ORY', 'CDG']
+    repository.close()
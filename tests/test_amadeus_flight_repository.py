@@ -0,0 +1,291 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from benchmarks.synthetic_offers import generate_flight_offers
+from amadeus_standin import AmadeusStandIn
+from interfaces.flight_repository import deadline
+from repositories.amadeus_flight_repository import AmadeusFlightRepository
+from repositories.cached_flight_repository import CachedFlightRepository
+from repositories.coalescing_flight_repository import CoalescingFlightRepository
+from repositories.resilience import OPEN, CLOSED, CircuitBreaker, CircuitOpenError, RetryPolicy, TokenBucket, UpstreamError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def resilient_repository(standin, sleeps, **kwargs):
+    # No jitter and no real sleeping, so the delays can be asserted
+    return AmadeusFlightRepository('key', 'secret', base_url=standin.base_url, sleep=sleeps.append,
+                                   retry_policy=RetryPolicy(max_attempts=3, base_delay=0.5, random=lambda: 1.0), **kwargs)
+
+
+def test_token_is_reused_until_it_expires():
+    with AmadeusStandIn(offers={'data': [{'id': '1'}]}) as standin:
+        repository = AmadeusFlightRepository('key', 'secret', base_url=standin.base_url)
+
+        for _ in range(3):
+            assert repository.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': [{'id': '1'}]}
+
+        assert standin.token_requests == 1
+        assert standin.offer_requests[0]['originLocationCode'] == 'MAD'
+
+
+def test_expired_token_is_refreshed():
+    with AmadeusStandIn(expires_in=30) as standin:
+        # With a 60s margin a 30s token is stale as soon as it is issued
+        repository = AmadeusFlightRepository('key', 'secret', base_url=standin.base_url, token_expiry_margin=60)
+        repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+
+        assert standin.token_requests == 2
+
+
+def test_concurrent_searches_share_one_token_refresh():
+    with AmadeusStandIn() as standin:
+        repository = AmadeusFlightRepository('key', 'secret', base_url=standin.base_url, pool_size=4)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: repository.get_flight_data('MAD', 'BCN', '2026-11-02'), range(16)))
+
+        assert standin.token_requests == 1
+        assert len(standin.offer_requests) == 16
+
+
+def test_revoked_token_is_replaced_and_the_call_retried():
+    with AmadeusStandIn() as standin:
+        repository = AmadeusFlightRepository('key', 'secret', base_url=standin.base_url)
+        repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        standin.revoked_tokens.add('token-1')
+
+        assert repository.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': []}
+        assert standin.token_requests == 2
+
+
+def test_server_errors_are_retried_with_exponential_backoff():
+    with AmadeusStandIn(offers={'data': [{'id': '1'}]}) as standin:
+        sleeps = []
+        repository = resilient_repository(standin, sleeps)
+        standin.fail_next(503, 502)
+
+        assert repository.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': [{'id': '1'}]}
+        assert len(standin.offer_requests) == 3
+        assert sleeps == [0.5, 1.0]
+
+
+def test_retried_responses_are_closed_before_the_backoff():
+    with AmadeusStandIn() as standin:
+        repository = resilient_repository(standin, [])
+        repository.get_amadeus_token()
+        responses = []
+        request = repository.session.request
+        repository.session.request = lambda *args, **kwargs: responses.append(request(*args, **kwargs)) or responses[-1]
+        standin.fail_next(503, 502)
+
+        repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+
+        assert [response.status_code for response in responses] == [503, 502, 200]
+        assert responses[0].raw.closed and responses[1].raw.closed
+
+
+def test_rate_limited_calls_honour_retry_after_and_slow_down():
+    with AmadeusStandIn(retry_after=2) as standin:
+        sleeps = []
+        clock = FakeClock()
+        repository = resilient_repository(standin, sleeps, rate_limiter=TokenBucket(100, clock=clock, sleep=clock.sleep))
+        repository.get_amadeus_token()
+        standin.fail_next(429)
+
+        assert repository.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': []}
+        assert sleeps == [2.0]
+        # Every thread waits out the pause, at half the rate, recovering a tenth per success
+        assert clock.now == pytest.approx(2.0)
+        assert repository.rate_limiter.rate == 60
+        assert repository.circuit_breaker.state == CLOSED
+
+
+def test_retries_give_up_and_the_circuit_opens_on_timeouts():
+    with AmadeusStandIn(latency=0.3) as standin:
+        sleeps = []
+        repository = resilient_repository(standin, sleeps, read_timeout=0.05,
+                                          circuit_breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+        repository.get_amadeus_token()
+
+        with pytest.raises(UpstreamError, match='ReadTimeout'):
+            repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        assert len(standin.offer_requests) == 3
+        assert repository.circuit_breaker.state == OPEN
+
+        # While open, calls fail without reaching the upstream
+        with pytest.raises(CircuitOpenError):
+            repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        assert len(standin.offer_requests) == 3
+
+
+def test_unexpected_request_errors_end_the_half_open_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    with AmadeusStandIn() as standin:
+        repository = resilient_repository(standin, [], circuit_breaker=breaker)
+        repository.get_amadeus_token()
+        breaker.record_failure()
+        clock.now = 31
+
+        request = repository.session.request
+        repository.session.request = lambda *args, **kwargs: (_ for _ in ()).throw(requests.TooManyRedirects('loop'))
+        with pytest.raises(UpstreamError, match='TooManyRedirects'):
+            repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        assert breaker.state == OPEN
+
+        # Once the reset timeout has passed again, the next trial goes through
+        repository.session.request = request
+        clock.now = 62
+        assert repository.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': []}
+        assert breaker.state == CLOSED
+
+
+def test_offer_bodies_that_stall_are_retried_and_count_against_the_breaker():
+    with AmadeusStandIn(offers=generate_flight_offers(offers=200, seed=1)) as standin:
+        sleeps = []
+        repository = resilient_repository(standin, sleeps, read_timeout=0.3)
+        repository.get_amadeus_token()
+
+        # Nothing was passed on yet, so the page is simply requested again
+        standin.stall_next(0)
+        assert len(repository.get_flight_data('MAD', 'JFK', '2026-11-02')['data']) == 200
+        assert sleeps == [0.5]
+        assert len(standin.offer_requests) == 2
+
+        # Once offers have been yielded a retry would repeat them, so the search fails instead
+        standin.stall_next(100000)
+        offers = []
+        with pytest.raises(UpstreamError, match='broke off after some offers'):
+            offers.extend(repository.iter_flight_offers('MAD', 'JFK', '2026-11-02'))
+        assert 0 < len(offers) < 200
+        assert len(standin.offer_requests) == 3
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        repository = resilient_repository(standin, [], read_timeout=0.3, circuit_breaker=breaker)
+        standin.stall_next(0)
+        with pytest.raises(CircuitOpenError):
+            repository.get_flight_data('MAD', 'JFK', '2026-11-02')
+        assert breaker.state == OPEN
+
+
+def test_a_search_deadline_bounds_retries_and_reads():
+    with AmadeusStandIn() as standin:
+        sleeps = []
+        repository = AmadeusFlightRepository('key', 'secret', base_url=standin.base_url, sleep=sleeps.append,
+                                             retry_policy=RetryPolicy(max_attempts=5, base_delay=0.5, random=lambda: 1.0))
+        repository.get_amadeus_token()
+        standin.fail_next(503, 503, 503, 503)
+
+        # The second backoff would outlast the deadline, so the call gives up instead of retrying
+        with deadline(0.9), pytest.raises(UpstreamError, match='no time left'):
+            repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        assert sleeps == [0.5]
+        assert len(standin.offer_requests) == 2
+
+        standin.latency = 0.5
+        started = time.monotonic()
+        with deadline(0.1), pytest.raises(UpstreamError):
+            repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+        assert time.monotonic() - started < 0.45
+
+def test_token_bucket_limits_rate_and_adapts():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, capacity=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(6):
+        assert bucket.acquire()
+    # Two tokens in the bucket, then one every half second
+    assert clock.now == pytest.approx(2.0)
+
+    bucket.throttle(retry_after=5)
+    assert bucket.rate == 1
+    assert not bucket.acquire(timeout=4)
+    assert bucket.acquire(timeout=10)
+    assert clock.now == pytest.approx(7.0)
+
+    for _ in range(20):
+        bucket.recover()
+    assert bucket.rate == 2
+
+
+def test_token_bucket_is_shared_between_threads():
+    bucket = TokenBucket(rate=50, capacity=5)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert all(executor.map(lambda _: bucket.acquire(), range(25)))
+
+    # Five from the burst, the other twenty at 50 per second
+    assert time.monotonic() - started >= 0.35
+
+
+def test_circuit_breaker_half_opens_after_the_reset_timeout():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 31
+    breaker.before_call()
+    # Only one trial call at a time while half open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 62
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_offers_are_streamed_across_result_pages():
+    pages = [generate_flight_offers(offers=4, seed=seed, origin='MAD', destination='JFK') for seed in range(3)]
+    for seed, page in enumerate(pages):
+        page['dictionaries'] = {'carriers': {f'C{seed}': f'Carrier {seed}'}}
+    with AmadeusStandIn(pages=pages) as standin:
+        repository = AmadeusFlightRepository('key', 'secret', base_url=standin.base_url)
+
+        offers = repository.iter_flight_offers('MAD', 'JFK', '2026-11-02')
+        assert next(offers) == pages[0]['data'][0]
+        # Nothing past the first page is requested before it is needed
+        assert len(standin.offer_requests) == 1
+        assert list(offers) == pages[0]['data'][1:] + pages[1]['data'] + pages[2]['data']
+        assert [request.get('page') for request in standin.offer_requests] == [None, '1', '2']
+        assert standin.offer_requests[2]['originLocationCode'] == 'MAD'
+
+        flight_data = repository.get_flight_data('MAD', 'JFK', '2026-11-02')
+        assert len(flight_data['data']) == 12
+        assert flight_data['dictionaries']['carriers'] == {'C0': 'Carrier 0', 'C1': 'Carrier 1', 'C2': 'Carrier 2'}
+
+        assert len(list(repository.iter_flight_offers('MAD', 'JFK', '2026-11-02', max_pages=2))) == 8
+
+
+def test_the_web_stack_streams_offers_through_the_cache_and_coalescing():
+    pages = [generate_flight_offers(offers=4, seed=seed, origin='MAD', destination='JFK') for seed in range(3)]
+    with AmadeusStandIn(pages=pages) as standin:
+        # Wired as in main.py
+        repository = CachedFlightRepository(CoalescingFlightRepository(
+            AmadeusFlightRepository('key', 'secret', base_url=standin.base_url)))
+
+        offers = repository.iter_flight_offers('MAD', 'JFK', '2026-11-02')
+        assert next(offers) == pages[0]['data'][0]
+        assert len(standin.offer_requests) == 1
+        assert len(list(offers)) == 11
+
+        assert len(list(repository.iter_flight_offers('MAD', 'JFK', '2026-11-02'))) == 12
+        assert len(standin.offer_requests) == 3
@@ -0,0 +1,90 @@
+import io
+import json
+import numpy as np
+from amadeus_standin import AmadeusStandIn
+from benchmarks.synthetic_offers import generate_flight_offers
+from frameworks.cli.batch_optimize import load_checkpoint, read_od_pairs, run_batch
+from repositories.local_file_flight_repository import LocalFileFlightRepository
+
+PAIRS = [('MAD', 'JFK', '2026-11-02'), ('MAD', 'LHR', '2026-11-02'), ('BCN', 'CDG', '2026-11-03')]
+
+
+def write_inputs(tmp_path):
+    offers = LocalFileFlightRepository(str(tmp_path / 'offers'))
+    for seed, (origin, destination, departure_date) in enumerate(PAIRS[:2]):
+        offers.save(origin, destination, departure_date,
+                    generate_flight_offers(offers=15, airports=8, seed=seed, origin=origin, destination=destination))
+    # No offers saved for the third pair
+    input_path = tmp_path / 'pairs.csv'
+    input_path.write_text('origin,destination,date\n' + ''.join(f'{o},{d},{day}\n' for o, d, day in PAIRS) + 'mad,jfk,2026-11-02\n')
+    return str(input_path), {'offers_dir': offers.directory}
+
+
+def test_read_od_pairs_accepts_csv_and_json_lines(tmp_path):
+    jsonl_path = tmp_path / 'pairs.jsonl'
+    jsonl_path.write_text('{"origin": "mad", "destination": "jfk", "date": "2026-11-02"}\n\n'
+                          '{"origin": "BCN", "destination": "CDG", "departure_date": "2026-11-03"}\n')
+    input_path, _ = write_inputs(tmp_path)
+
+    assert read_od_pairs(str(jsonl_path)) == [PAIRS[0], PAIRS[2]]
+    assert read_od_pairs(input_path) == PAIRS + [PAIRS[0]]
+
+
+def test_batch_optimizes_pairs_in_worker_processes(tmp_path):
+    input_path, config = write_inputs(tmp_path)
+    output_path = str(tmp_path / 'results.jsonl')
+    progress = io.StringIO()
+
+    summary = run_batch(input_path, output_path, config, processes=2, columnar_path=str(tmp_path / 'results.npz'),
+                        progress_file=progress)
+
+    assert summary == {'pairs': 4, 'skipped': 0, 'processed': 3, 'errors': 1}
+    records = {(record['origin'], record['destination']): record for record in load_checkpoint(output_path)}
+    assert records[('MAD', 'JFK')]['status'] == 'ok'
+    assert records[('MAD', 'JFK')]['path'][0] == 'MAD' and records[('MAD', 'JFK')]['path'][-1] == 'JFK'
+    assert records[('MAD', 'JFK')]['routes'] == 15
+    # No offers file is not the same as no routes, and is retried on resume
+    assert records[('BCN', 'CDG')]['status'] == 'missing_offers'
+    assert '3/3 pairs optimized' in progress.getvalue()
+
+    columns = np.load(str(tmp_path / 'results.npz'))
+    assert columns['origin'].tolist() == ['MAD', 'MAD', 'BCN']
+    assert columns['path'][0].startswith('MAD-')
+    assert np.isnan(columns['price'][2])
+
+
+def test_batch_resumes_from_its_checkpoint(tmp_path):
+    input_path, config = write_inputs(tmp_path)
+    output_path = tmp_path / 'results.jsonl'
+    run_batch(input_path, str(output_path), config, processes=1, progress_file=None)
+    finished = output_path.read_text().splitlines()
+
+    # A crash while writing leaves half a record behind
+    output_path.write_text('\n'.join(finished[:1]) + '\n' + finished[1][:20])
+    summary = run_batch(input_path, str(output_path), config, processes=1, progress_file=None)
+
+    assert summary == {'pairs': 4, 'skipped': 1, 'processed': 2, 'errors': 1}
+    assert sorted(json.loads(line)['destination'] for line in output_path.read_text().splitlines()) == ['CDG', 'JFK', 'LHR']
+    assert run_batch(input_path, str(output_path), config, processes=1, progress_file=None)['processed'] == 1
+
+    LocalFileFlightRepository(config['offers_dir']).save(*PAIRS[2], generate_flight_offers(offers=5, origin='BCN', destination='CDG'))
+    assert run_batch(input_path, str(output_path), config, processes=1, progress_file=None)['errors'] == 0
+    assert run_batch(input_path, str(output_path), config, processes=1, progress_file=None)['processed'] == 0
+    assert run_batch(input_path, str(output_path), config, processes=1, resume=False, progress_file=None)['processed'] == 3
+
+
+def test_upstream_error_payloads_are_recorded_as_errors_and_retried(tmp_path):
+    input_path = tmp_path / 'pairs.csv'
+    input_path.write_text('MAD,JFK,2026-11-02\n')
+    output_path = str(tmp_path / 'results.jsonl')
+    flight_data = generate_flight_offers(offers=5, origin='MAD', destination='JFK')
+    with AmadeusStandIn(offers=flight_data) as standin:
+        config = {'api_key': 'key', 'api_secret': 'secret', 'base_url': standin.base_url, 'rate_limit': 10}
+        standin.fail_next(400)
+
+        assert run_batch(str(input_path), output_path, config, processes=1, progress_file=None)['errors'] == 1
+        assert load_checkpoint(output_path)[0]['status'] == 'error'
+        assert '400' in load_checkpoint(output_path)[0]['error']
+
+        assert run_batch(str(input_path), output_path, config, processes=1, progress_file=None)['processed'] == 1
+        assert load_checkpoint(output_path)[-1]['status'] == 'ok'
@@ -0,0 +1,221 @@
+import json
+import os
+import pytest
+from frameworks.flask.flask_app import create_app
+from frameworks.flask.map_rendering import MapRenderer
+from interfaces.flight_repository import FlightRepository
+from repositories.openflights_airport_repository import OpenFlightsAirportRepository
+from repositories.resilience import CircuitOpenError
+from use_cases.calculate_route_duration import convert_duration_to_minutes
+from use_cases.shortest_path import dijkstra
+
+AIRPORTS_SAMPLE = os.path.join(os.path.dirname(__file__), 'data', 'airports_sample.dat')
+
+
+def make_offer(price, duration, legs):
+    segments = [{
+        'departure': {'iataCode': departure, 'at': departs_at},
+        'arrival': {'iataCode': arrival, 'at': arrives_at},
+        'carrierCode': carrier,
+        'duration': 'PT1H'
+    } for departure, arrival, departs_at, arrives_at, carrier in legs]
+    return {'price': {'total': price, 'currency': 'EUR'}, 'itineraries': [{'duration': duration, 'segments': segments}]}
+
+
+OFFERS = {'data': [
+    make_offer('120.50', 'PT2H10M', [('MAD', 'LHR', '2026-11-02T08:00:00', '2026-11-02T09:10:00', 'IB')]),
+    make_offer('99.00', 'PT5H', [
+        ('MAD', 'CDG', '2026-11-02T06:00:00', '2026-11-02T08:00:00', 'AF'),
+        ('CDG', 'LHR', '2026-11-02T09:30:00', '2026-11-02T10:00:00', 'AF'),
+    ]),
+]}
+
+
+class StaticFlightRepository(FlightRepository):
+    def __init__(self, offers=OFFERS):
+        self.offers = offers
+        self.calls = []
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        self.calls.append((origin, destination, departure_date, adults))
+        return self.offers
+
+
+@pytest.fixture
+def flight_repository():
+    return StaticFlightRepository()
+
+
+@pytest.fixture
+def client(flight_repository):
+    airport_repository = OpenFlightsAirportRepository(AIRPORTS_SAMPLE)
+    app = create_app(flight_repository, airport_repository, dijkstra, convert_duration_to_minutes)
+    return app.test_client()
+
+
+def test_search_renders_routes_and_map(client):
+    response = client.post('/', data={'origin': 'MAD', 'destination': 'LHR', 'date': '2026-11-02'})
+
+    assert response.status_code == 200
+    assert b'Flight route from MAD to LHR' in response.data
+    assert b'Best balance' in response.data
+    assert b'MAD -&gt; CDG -&gt; LHR' in response.data
+
+
+class UnavailableFlightRepository(FlightRepository):
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        raise CircuitOpenError("Upstream unavailable")
+
+
+def test_search_reports_an_unavailable_upstream():
+    app = create_app(UnavailableFlightRepository(), OpenFlightsAirportRepository(AIRPORTS_SAMPLE), dijkstra, convert_duration_to_minutes)
+
+    response = app.test_client().post('/', data={'origin': 'MAD', 'destination': 'LHR', 'date': '2026-11-02'})
+
+    assert response.status_code == 503
+    assert b'temporarily unavailable' in response.data
+
+
+def test_metrics_endpoint_reports_requests_and_stage_timings(client):
+    client.post('/', data={'origin': 'MAD', 'destination': 'LHR', 'date': '2026-11-02'})
+    client.get('/airportSearch/?term=lon')
+
+    metrics = client.get('/metrics').get_data(as_text=True)
+
+    assert 'http_requests_total{method="POST",endpoint="/",status="200"} 1' in metrics
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="/airportSearch/"} 1' in metrics
+    for stage in ('upstream_fetch', 'optimization', 'coordinate_lookup', 'map_render'):
+        assert f'flight_search_stage_seconds_count{{stage="{stage}"}} 1' in metrics
+    # A single search builds its routes while the offers are streamed in
+    assert 'stage="route_building"' not in metrics
+
+
+def test_search_fans_out_over_airports_and_dates(client, flight_repository):
+    response = client.post('/', data={'origin': 'MAD', 'destination': 'LHR,LGW', 'date': '2026-11-02', 'flex_days': '1'})
+
+    assert response.status_code == 200
+    assert len(flight_repository.calls) == 6
+    assert ('MAD', 'LGW', '2026-11-03', 1) in flight_repository.calls
+
+
+def test_search_rejects_a_malformed_date(client, flight_repository):
+    response = client.post('/', data={'origin': 'MAD', 'destination': 'LHR', 'date': 'bad', 'flex_days': '1'})
+
+    assert response.status_code == 400
+    assert b'YYYY-MM-DD' in response.data
+    assert flight_repository.calls == []
+
+
+def test_api_search_returns_routes_and_ranking(client):
+    response = client.get('/api/search?origin=MAD&destination=LHR&date=2026-11-02')
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert [route['id'] for route in result['routes']] == [0, 1]
+    assert result['best_route']['path'][0] == 'MAD'
+    assert sorted(result['ranking']) == [0, 1]
+    assert set(result['highlights']) == {'fastest', 'cheapest', 'best_balance'}
+    assert result['searches'] == [{'origin': 'MAD', 'destination': 'LHR', 'date': '2026-11-02', 'error': None}]
+
+
+def test_api_search_streams_ndjson_records(client):
+    response = client.post('/api/search', json={'origin': 'MAD', 'destination': 'LHR,LGW', 'date': '2026-11-02', 'stream': True})
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert response.mimetype == 'application/x-ndjson'
+    assert [record['type'] for record in records] == ['routes', 'routes', 'result']
+    assert [route['id'] for record in records[:2] for route in record['routes']] == [0, 1, 2, 3]
+    assert sorted(records[-1]['ranking']) == [0, 1, 2, 3]
+
+
+def test_api_search_results_can_be_reranked_without_refetching(client, flight_repository):
+    search_id = client.get('/api/search?origin=MAD&destination=LHR&date=2026-11-02').get_json()['search_id']
+    ranking_url = f'/api/search/{search_id}/ranking'
+
+    ranking = client.get(ranking_url).get_json()
+    assert ranking['ranking'] == [0, 1] and ranking['carriers'] == ['AF', 'IB']
+    assert ranking['scores'][0] == pytest.approx(130 / 300 + 1)
+    assert client.get(ranking_url + '?price=1').get_json()['ranking'] == [1, 0]
+    assert client.post(ranking_url, json={'weights': {'duration': 0, 'price': 1}, 'k': 1}).get_json()['ranking'] == [1]
+    assert client.get(ranking_url + '?max_stops=0').get_json()['ranking'] == [0]
+    assert client.get(ranking_url + '?carriers=af').get_json()['ranking'] == [1]
+    assert client.post(ranking_url, json={'exclude_carriers': ['AF']}).get_json()['ranking'] == [0]
+    assert len(flight_repository.calls) == 1
+
+    assert client.get(ranking_url + '?comfort=1').status_code == 400
+    assert client.post(ranking_url, json={'weights': {'comfort': 1}}).status_code == 400
+    assert client.post(ranking_url, json={'comfort': 1}).status_code == 400
+    assert client.get(ranking_url + '?price=nan').status_code == 400
+    assert client.post(ranking_url, json={'weights': {'price': 'inf'}}).status_code == 400
+    assert client.post(ranking_url, json=[1]).status_code == 400
+    assert client.get(ranking_url + '?max_stops=one').status_code == 400
+    assert client.get('/api/search/unknown/ranking').status_code == 404
+
+
+def test_nearby_airport_search_by_code_or_coordinates(client):
+    response = client.get('/airportSearch/nearby?code=LHR&k=3')
+
+    nearby = response.get_json()
+    assert response.status_code == 200
+    assert [airport['value'] for airport in nearby] == ['LHR', 'LCY', 'LGW']
+    assert nearby[0]['distance_km'] == 0
+
+    nearby = client.get('/airportSearch/nearby?lat=48.8566&lon=2.3522&radius_km=50').get_json()
+    assert [airport['value'] for airport in nearby] == ['ORY', 'CDG']
+
+    assert client.get('/airportSearch/nearby?code=XXX').status_code == 404
+    assert client.get('/airportSearch/nearby?lat=95&lon=0').status_code == 400
+    assert client.get('/airportSearch/nearby?lat=40').status_code == 400
+
+
+def test_api_search_reports_upstream_error_payloads():
+    rejected = StaticFlightRepository({'errors': [{'status': 400, 'title': 'INVALID DATE', 'detail': 'Date is in the past'}]})
+    app = create_app(rejected, OpenFlightsAirportRepository(AIRPORTS_SAMPLE), dijkstra, convert_duration_to_minutes)
+
+    result = app.test_client().get('/api/search?origin=MAD&destination=LHR&date=2026-11-02').get_json()
+
+    assert result['routes'] == []
+    assert result['searches'] == [{'origin': 'MAD', 'destination': 'LHR', 'date': '2026-11-02', 'error': 'Date is in the past'}]
+
+
+def test_api_search_validates_parameters(client):
+    assert client.get('/api/search?origin=MAD').status_code == 400
+    assert client.get('/api/search?origin=MAD&destination=LHR&date=2026-13-45').status_code == 400
+    assert client.post('/api/search', json={'origin': 'MAD', 'destination': 'LHR', 'date': 20261102}).status_code == 400
+    assert client.post('/api/search', json={'origin': 'MAD', 'destination': 'LHR', 'date': '2026-11-02', 'flex_days': None}).status_code == 400
+    assert client.post('/api/search', json=[1]).status_code == 400
+
+
+def test_route_geometry_returns_great_circle_geojson(client):
+    response = client.get('/api/route-geometry?path=MAD,LHR,JFK')
+
+    geometry = response.get_json()
+    lines = [feature for feature in geometry['features'] if feature['geometry']['type'] == 'LineString']
+    points = [feature for feature in geometry['features'] if feature['geometry']['type'] == 'Point']
+    assert response.status_code == 200
+    assert [line['properties']['origin'] for line in lines] == ['MAD', 'LHR']
+    assert lines[1]['geometry']['coordinates'][0] == [-0.46194, 51.4706]
+    assert lines[1]['geometry']['coordinates'][-1] == [-73.7789, 40.6398]
+    # The great circle from London to New York bends north of both airports
+    assert max(latitude for _, latitude in lines[1]['geometry']['coordinates']) > 51.4706
+    assert [point['properties']['iata'] for point in points] == ['MAD', 'LHR', 'JFK']
+
+
+def test_route_geometry_rejects_unknown_airports(client):
+    response = client.get('/api/route-geometry?path=MAD,XXX')
+
+    assert response.status_code == 404
+    assert response.get_json()['airports'] == ['XXX']
+    assert client.get('/api/route-geometry?path=MAD').status_code == 400
+
+
+def test_map_renderer_reuses_html_and_skips_unknown_coordinates():
+    renderer = MapRenderer()
+    legs = [('MAD', 'XXX', (40.471926, -3.56264), (None, None))]
+
+    first = renderer.render(legs)
+    second = renderer.render(list(legs))
+
+    assert first is second
+    assert (renderer.hits, renderer.misses) == (1, 1)
+    assert 'Origin: MAD' in first and 'Destination: XXX' not in first
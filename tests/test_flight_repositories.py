@@ -0,0 +1,310 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from benchmarks.synthetic_offers import generate_flight_offers
+from interfaces.flight_repository import FlightRepository
+from repositories.cached_flight_repository import CachedFlightRepository
+from repositories.coalescing_flight_repository import CoalescingFlightRepository, SingleFlight
+from repositories.json_array_stream import JsonArrayStream
+from repositories.local_file_flight_repository import LocalFileFlightRepository
+from repositories.search_store import SearchStore
+from repositories.sqlite_flight_repository import SqliteFlightRepository
+from use_cases.build_routes import build_routes, flight_offers, iter_routes
+from use_cases.calculate_route_duration import convert_duration_to_minutes
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFlightRepository(FlightRepository):
+    def __init__(self):
+        self.calls = []
+        self.called = threading.Event()
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        self.calls.append((origin, destination, departure_date, adults))
+        self.called.set()
+        return {'data': [{'id': str(len(self.calls))}]}
+
+
+def test_cache_serves_fresh_entries_without_calling_upstream():
+    upstream = CountingFlightRepository()
+    cache = CachedFlightRepository(upstream, clock=FakeClock())
+
+    first = cache.get_flight_data('MAD', 'BCN', '2026-11-02')
+    second = cache.get_flight_data('mad', 'bcn', '2026-11-02')
+    cache.get_flight_data('MAD', 'BCN', '2026-11-02', adults=2)
+
+    assert first is second
+    assert len(upstream.calls) == 2
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_cache_evicts_least_recently_used_entry():
+    upstream = CountingFlightRepository()
+    cache = CachedFlightRepository(upstream, max_entries=2, clock=FakeClock())
+
+    cache.get_flight_data('MAD', 'BCN', '2026-11-02')
+    cache.get_flight_data('MAD', 'LHR', '2026-11-02')
+    cache.get_flight_data('MAD', 'BCN', '2026-11-02')
+    cache.get_flight_data('MAD', 'CDG', '2026-11-02')
+    cache.get_flight_data('MAD', 'BCN', '2026-11-02')
+
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['hits'] == 2
+    assert len(upstream.calls) == 3
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    upstream = CountingFlightRepository()
+    clock = FakeClock()
+    cache = CachedFlightRepository(upstream, ttl=10, stale_ttl=100, clock=clock)
+    cache.get_flight_data('MAD', 'BCN', '2026-11-02')
+    upstream.called.clear()
+
+    clock.now = 50
+    assert cache.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': [{'id': '1'}]}
+    assert upstream.called.wait(1)
+
+    for _ in range(100):
+        if cache.stats()['refreshes']:
+            break
+        time.sleep(0.01)
+    assert cache.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': [{'id': '2'}]}
+    assert cache.stats()['stale_hits'] == 1
+
+
+def test_expired_entry_is_fetched_again_and_errors_are_not_cached():
+    upstream = CountingFlightRepository()
+    clock = FakeClock()
+    cache = CachedFlightRepository(upstream, ttl=10, stale_ttl=10, clock=clock)
+    cache.get_flight_data('MAD', 'BCN', '2026-11-02')
+
+    clock.now = 25
+    assert cache.get_flight_data('MAD', 'BCN', '2026-11-02') == {'data': [{'id': '2'}]}
+
+    upstream.get_flight_data = lambda *args: {'errors': [{'status': 500}]}
+    cache.get_flight_data('MAD', 'LHR', '2026-11-02')
+    assert cache.stats()['entries'] == 1
+
+
+class BlockingFlightRepository(FlightRepository):
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        self.calls += 1
+        self.release.wait(2)
+        return {'data': [{'id': str(self.calls)}]}
+
+
+def test_concurrent_identical_searches_share_one_upstream_call():
+    upstream = BlockingFlightRepository()
+    repository = CoalescingFlightRepository(upstream)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futures = [executor.submit(repository.get_flight_data, 'MAD', 'BCN', '2026-11-02') for _ in range(5)]
+        while repository.stats()['calls'] < 5:
+            time.sleep(0.01)
+        upstream.release.set()
+        results = [future.result() for future in futures]
+
+    assert upstream.calls == 1
+    assert all(result is results[0] for result in results)
+    assert repository.stats() == {'calls': 5, 'executions': 1, 'coalesced': 4}
+
+    repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+    assert upstream.calls == 2
+
+
+def test_streamed_searches_join_an_identical_search_in_flight():
+    upstream = BlockingFlightRepository()
+    repository = CoalescingFlightRepository(upstream)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(repository.get_flight_data, 'MAD', 'BCN', '2026-11-02')
+        while repository.stats()['calls'] < 1:
+            time.sleep(0.01)
+        document = {}
+        follower = executor.submit(lambda: list(repository.iter_flight_offers('MAD', 'BCN', '2026-11-02', document=document)))
+        while repository.stats()['coalesced'] < 1:
+            time.sleep(0.01)
+        upstream.release.set()
+
+        assert follower.result() == leader.result()['data']
+    assert upstream.calls == 1
+
+
+def test_single_flight_shares_exceptions_with_waiting_callers():
+    single_flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_search():
+        started.set()
+        release.wait(2)
+        raise RuntimeError("upstream down")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(single_flight.do, 'MAD-BCN', failing_search)
+        started.wait(2)
+        follower = executor.submit(single_flight.do, 'MAD-BCN', failing_search)
+        while single_flight.stats()['coalesced'] < 1:
+            time.sleep(0.01)
+        release.set()
+
+        for future in (leader, follower):
+            with pytest.raises(RuntimeError):
+                future.result()
+
+
+def test_sqlite_flight_repository_batches_writes_and_expires_offers(tmp_path):
+    upstream = CountingFlightRepository()
+    clock = FakeClock()
+    database_path = str(tmp_path / 'offers.db')
+    repository = SqliteFlightRepository(upstream, database_path, ttl=60, batch_size=2, clock=clock)
+
+    first = repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+    assert repository.get_flight_data('MAD', 'BCN', '2026-11-02') == first
+    # One offer set is still buffered, so nothing has been written yet
+    other_worker = SqliteFlightRepository(CountingFlightRepository(), database_path, clock=clock)
+    assert other_worker.connections.get().execute('SELECT COUNT(*) FROM offers').fetchone()[0] == 0
+
+    repository.get_flight_data('MAD', 'LHR', '2026-11-02')
+    assert other_worker.get_flight_data('MAD', 'BCN', '2026-11-02') == first
+    assert len(upstream.calls) == 2
+
+    clock.now = 61
+    assert repository.purge_expired() == 2
+    repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+    assert len(upstream.calls) == 3
+    repository.close()
+    other_worker.close()
+
+
+def test_sqlite_flight_repository_flushes_on_a_timer_and_on_close(tmp_path):
+    database_path = str(tmp_path / 'offers.db')
+    reader = SqliteFlightRepository(CountingFlightRepository(), database_path)
+
+    def stored():
+        return reader.connections.get().execute('SELECT COUNT(*) FROM offers').fetchone()[0]
+
+    repository = SqliteFlightRepository(CountingFlightRepository(), database_path, batch_size=100, flush_interval=0.05)
+    repository.get_flight_data('MAD', 'BCN', '2026-11-02')
+    deadline = time.monotonic() + 2
+    while stored() == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert stored() == 1
+    repository.close()
+
+    repository = SqliteFlightRepository(CountingFlightRepository(), database_path, batch_size=100, flush_interval=60)
+    repository.get_flight_data('MAD', 'LHR', '2026-11-02')
+    assert stored() == 1
+    repository.close()
+    assert stored() == 2
+    reader.close()
+
+
+class StreamingFlightRepository(FlightRepository):
+    def __init__(self, flight_data):
+        self.flight_data = flight_data
+        self.streams = 0
+
+    def iter_flight_offers(self, origin, destination, departure_date, adults=1, document=None):
+        self.streams += 1
+        yield from self.flight_data['data']
+        if document is not None:
+            document.update((name, value) for name, value in self.flight_data.items() if name != 'data')
+
+
+def test_caches_pass_streamed_offers_through_and_store_them_once_read(tmp_path):
+    flight_data = generate_flight_offers(offers=5, seed=4)
+    flight_data['meta'] = {'count': 5}
+    upstream = StreamingFlightRepository(flight_data)
+    database_path = str(tmp_path / 'offers.db')
+    repository = CachedFlightRepository(SqliteFlightRepository(upstream, database_path, batch_size=1))
+
+    # An abandoned stream is not stored
+    next(repository.iter_flight_offers('MAD', 'JFK', '2026-11-02'))
+    document = {}
+    assert list(repository.iter_flight_offers('MAD', 'JFK', '2026-11-02', document=document)) == flight_data['data']
+    assert document == {'meta': {'count': 5}, 'dictionaries': flight_data['dictionaries']}
+    assert list(repository.iter_flight_offers('MAD', 'JFK', '2026-11-02')) == flight_data['data']
+    assert repository.get_flight_data('MAD', 'JFK', '2026-11-02') == flight_data
+    assert upstream.streams == 2
+
+    reader = SqliteFlightRepository(CountingFlightRepository(), database_path)
+    assert reader.get_flight_data('MAD', 'JFK', '2026-11-02') == flight_data
+    reader.close()
+
+    # Error payloads reach the caller through the document and are never stored
+    failing = StreamingFlightRepository({'data': [], 'errors': [{'status': 400}]})
+    repository = CachedFlightRepository(SqliteFlightRepository(failing, database_path, batch_size=1))
+    for _ in range(2):
+        document = {}
+        assert list(repository.iter_flight_offers('MAD', 'LHR', '2026-11-02', document=document)) == []
+        assert document == {'errors': [{'status': 400}]}
+    assert failing.streams == 2
+
+
+def test_search_store_expires_and_evicts_searches():
+    clock = FakeClock()
+    store = SearchStore(max_entries=2, ttl=60, clock=clock)
+    first = store.put('first')
+    second = store.put('second')
+
+    clock.now = 50
+    assert store.get(first) == 'first'
+    # Reading a search keeps it alive and makes it the most recently used
+    clock.now = 100
+    assert store.get(first) == 'first'
+    assert store.get(second) is None
+
+    third = store.put('third')
+    store.put('fourth')
+    assert store.get(first) is None and store.get(third) == 'third'
+    assert store.stats() == {'stored': 4, 'hits': 3, 'misses': 2, 'evictions': 1, 'expirations': 1, 'entries': 2}
+
+
+def test_json_array_stream_decodes_offers_split_across_chunks():
+    flight_data = generate_flight_offers(offers=10, seed=3)
+    flight_data['data'][0]['source'] = 'GDS ✈ Zürich'
+    document = {'meta': {'count': 10, 'total': 1.5e3}, 'data': flight_data['data'], 'dictionaries': {'carriers': {'IB': 'IBERIA'}}}
+    body = json.dumps(document, ensure_ascii=False, indent=2).encode('utf-8')
+
+    # Chunk boundaries fall inside strings, numbers and multi-byte characters
+    for size in (1, 5, 64, len(body)):
+        stream = JsonArrayStream(body[start:start + size] for start in range(0, len(body), size))
+        assert list(stream) == flight_data['data']
+        assert stream.document == {'meta': {'count': 10, 'total': 1.5e3}, 'dictionaries': {'carriers': {'IB': 'IBERIA'}}}
+
+    errors = JsonArrayStream([b'{"errors": [{"status": 400}]}'])
+    assert list(errors) == [] and errors.document == {'errors': [{'status': 400}]}
+    with pytest.raises(ValueError):
+        list(JsonArrayStream([body[:len(body) // 2]]))
+
+
+def test_local_file_offers_stream_into_the_same_routes(tmp_path):
+    repository = LocalFileFlightRepository(str(tmp_path))
+    repository.save('MAD', 'JFK', '2026-11-02', generate_flight_offers(offers=20, seed=1, origin='MAD', destination='JFK'))
+
+    streamed = iter_routes(flight_offers(repository, 'MAD', 'JFK', '2026-11-02'), convert_duration_to_minutes)
+    expected = build_routes(repository.get_flight_data('MAD', 'JFK', '2026-11-02'), convert_duration_to_minutes)
+    assert [route.to_dict() for route in streamed] == [route.to_dict() for route in expected]
+    with pytest.raises(FileNotFoundError):
+        list(flight_offers(repository, 'BCN', 'JFK', '2026-11-02'))
+    # Repositories without a streaming path fall back to the whole response
+    upstream = CountingFlightRepository()
+    upstream.get_flight_data = lambda *search: {'data': [{'id': '1'}], 'errors': [{'status': 400}]}
+    document = {}
+    assert list(flight_offers(upstream, 'MAD', 'JFK', '2026-11-02', document=document)) == [{'id': '1'}]
+    assert document == {'errors': [{'status': 400}]}
@@ -0,0 +1,453 @@
+import random
+import time
+import numpy as np
+import pytest
+from benchmarks.synthetic_offers import generate_flight_offers
+from entities.flight import Flight
+from interfaces.flight_repository import remaining_time
+from entities.segment import Segment
+from use_cases.build_routes import AirportCodes, build_routes
+from use_cases.connection_scan import ConnectionTimetable, airport_offsets, departure_profile, earliest_arrival
+from use_cases.calculate_route_duration import convert_duration_to_minutes, convert_durations_to_minutes, parse_iso_duration
+from use_cases.fan_out_search import date_window, search_combinations, search_flexible
+from use_cases.k_shortest_paths import KShortestPaths, k_shortest_routes
+from use_cases.find_best_flight import bellman_ford, bellman_ford_distances
+from use_cases.pareto_routes import pareto_front, pareto_itineraries
+from use_cases.score_routes import CandidateRoutes, RouteMatrix, top_k_routes
+from use_cases.shortest_path import airport_ids, build_route_graph, dijkstra
+
+
+AIRPORT_CODES = AirportCodes()
+
+
+def make_segment(departure, arrival, carrier='IB', departure_at='2026-11-02T08:00:00', arrival_at='2026-11-02T10:00:00',
+                 duration=None):
+    return Segment(departure, arrival, AIRPORT_CODES.intern(departure), AIRPORT_CODES.intern(arrival),
+                   departure_at, arrival_at, carrier, duration=duration)
+
+
+def make_route(airports, duration, price, carrier='IB'):
+    segments = tuple(make_segment(departure, arrival, carrier) for departure, arrival in zip(airports, airports[1:]))
+    return Flight(airports[0], airports[-1], duration, float(price), segments, 'EUR')
+
+
+def test_dijkstra_picks_the_lightest_direct_route():
+    routes = [
+        make_route(['MAD', 'JFK'], 600, 900),
+        make_route(['MAD', 'JFK'], 480, 700),
+        make_route(['MAD', 'JFK'], 500, 650),
+    ]
+
+    best_route = dijkstra(routes, 'MAD')
+
+    assert best_route.route is routes[2]
+    assert best_route.duration == 500
+    assert best_route.path == ['MAD', 'JFK']
+    assert best_route.cost == 500 / 600 + 650 / 900
+
+
+def test_dijkstra_reconstructs_the_connection_path():
+    routes = [
+        make_route(['MAD', 'JFK'], 900, 1500),
+        make_route(['MAD', 'LHR', 'JFK'], 600, 300),
+    ]
+
+    best_route = dijkstra(routes, 'MAD', 'JFK')
+
+    assert best_route.path == ['MAD', 'LHR', 'JFK']
+    assert [segment.arrival_code for segment in best_route.path_segments] == ['LHR', 'JFK']
+    assert best_route.segments is routes[1].segments
+
+
+def test_dijkstra_accepts_city_codes_and_empty_input():
+    routes = [make_route(['LHR', 'CDG'], 75, 120), make_route(['LGW', 'ORY'], 70, 90)]
+
+    assert dijkstra(routes, 'LON').path == ['LGW', 'ORY']
+    assert dijkstra([], 'MAD') is None
+
+
+def test_k_shortest_routes_lists_ranked_alternatives():
+    routes = [
+        make_route(['MAD', 'JFK'], 900, 1500),
+        make_route(['MAD', 'LHR', 'JFK'], 600, 300),
+        make_route(['MAD', 'CDG', 'JFK'], 700, 400),
+    ]
+
+    alternatives = k_shortest_routes(routes, 'MAD', 'JFK', k=5)
+
+    # Every leg costs its offer's combined weight, so the one-stop routes pay it twice
+    assert [alternative.path for alternative in alternatives] == [['MAD', 'LHR', 'JFK'], ['MAD', 'JFK'], ['MAD', 'CDG', 'JFK']]
+    assert [alternative.route for alternative in alternatives] == [routes[1], routes[0], routes[2]]
+    assert alternatives[0].cost == dijkstra(routes, 'MAD', 'JFK').cost
+    assert alternatives[1].cost == pytest.approx(2.0)
+    assert k_shortest_routes(routes, 'JFK', 'MAD') == []
+    assert k_shortest_routes([], 'MAD') == []
+
+
+def loopless_path_costs(graph, source, targets):
+    costs = []
+
+    def extend(airport, cost, visited):
+        if airport in targets:
+            costs.append(cost)
+            return
+        for arrival, weight, _, _ in graph.get(airport, ()):
+            if arrival not in visited:
+                extend(arrival, cost + weight, visited | {arrival})
+
+    extend(source, 0, {source})
+    return sorted(costs)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_k_shortest_paths_match_exhaustive_enumeration(seed):
+    routes = synthetic_routes(seed, offers=25, airports=8)
+    origin, destination = routes[0].origin, routes[0].destination
+    ids = airport_ids(routes)
+    graph = build_route_graph(routes)
+
+    search = KShortestPaths(graph, [ids[origin]], {ids[destination]})
+    costs = [cost for cost, _ in search.paths(12)]
+
+    assert costs == pytest.approx(loopless_path_costs(graph, ids[origin], {ids[destination]})[:12])
+    # Most spur paths come straight from the reverse shortest-path tree
+    assert search.searches < 12 * 4
+
+
+def test_pareto_front_drops_dominated_itineraries():
+    routes = [
+        make_route(['MAD', 'JFK'], 480, 900),
+        make_route(['MAD', 'LHR', 'JFK'], 600, 500),
+        make_route(['MAD', 'JFK'], 500, 950),
+        make_route(['MAD', 'LHR', 'BOS', 'JFK'], 700, 500),
+        make_route(['MAD', 'CDG', 'JFK'], 620, 520),
+        make_route(['MAD', 'JFK'], 650, 600),
+    ]
+
+    front = pareto_front(routes)
+
+    assert front == [routes[0], routes[1], routes[5]]
+
+
+def test_pareto_itineraries_highlights_fastest_cheapest_and_balance():
+    routes = [
+        make_route(['MAD', 'JFK'], 480, 1000),
+        make_route(['MAD', 'LHR', 'JFK'], 900, 300),
+        make_route(['MAD', 'CDG', 'JFK'], 560, 450),
+    ]
+
+    highlights = pareto_itineraries(routes)
+
+    assert highlights['fastest'] is routes[0]
+    assert highlights['cheapest'] is routes[1]
+    assert highlights['best_balance'] is routes[2]
+    assert pareto_itineraries([]) is None
+
+
+def test_route_matrix_scores_match_normalized_weights():
+    routes = [
+        make_route(['MAD', 'JFK'], 480, 1000),
+        make_route(['MAD', 'LHR', 'JFK'], 960, 250),
+    ]
+
+    scores = RouteMatrix.from_routes(routes).scores({'duration': 1, 'price': 1, 'stops': 1})
+
+    assert scores.tolist() == [0.5 + 1.0 + 0.0, 1.0 + 0.25 + 1.0]
+
+
+def test_top_k_routes_ranks_by_weights():
+    routes = [
+        make_route(['MAD', 'JFK'], 480, 1000),
+        make_route(['MAD', 'LHR', 'JFK'], 960, 250),
+        make_route(['MAD', 'CDG', 'JFK'], 600, 500),
+        make_route(['MAD', 'JFK'], 700, 900),
+    ]
+
+    assert top_k_routes(routes, 2) == [routes[2], routes[1]]
+    assert top_k_routes(routes, 1, {'duration': 1}) == [routes[0]]
+    assert top_k_routes(routes, 10, {'price': 1}) == [routes[1], routes[2], routes[3], routes[0]]
+    with pytest.raises(ValueError):
+        top_k_routes(routes, 1, {'comfort': 1})
+
+
+def test_candidate_routes_filter_and_rerank():
+    routes = [
+        make_route(['MAD', 'JFK'], 480, 1000, carrier='IB'),
+        make_route(['MAD', 'LHR', 'JFK'], 960, 250, carrier='BA'),
+        make_route(['MAD', 'CDG', 'JFK'], 600, 500, carrier='AF'),
+        make_route(['MAD', 'JFK'], 700, 900, carrier='UX'),
+    ]
+    candidates = CandidateRoutes(routes)
+
+    assert [route for route, _ in candidates.rank()] == top_k_routes(routes, 4)
+    assert [route for route, _ in candidates.rank(2, {'price': 1})] == [routes[1], routes[2]]
+    assert [route for route, _ in candidates.rank(max_stops=0)] == [routes[0], routes[3]]
+    assert [route for route, _ in candidates.rank(carriers=['IB', 'BA'])] == [routes[1], routes[0]]
+    assert [route for route, _ in candidates.rank(exclude_carriers=['AF', 'XX'])] == [routes[1], routes[0], routes[3]]
+    assert candidates.rank(carriers=['XX']) == []
+    # Scores stay normalized over the whole search, not just the routes left by the filters
+    assert candidates.rank(max_stops=0)[1][1] == pytest.approx(700 / 960 + 900 / 1000)
+
+
+def synthetic_routes(seed, offers=60, max_segments=3, airports=12):
+    flight_data = generate_flight_offers(offers, max_segments, airports, seed)
+    return build_routes(flight_data, convert_duration_to_minutes)
+
+
+def test_synthetic_offers_are_deterministic_and_well_formed():
+    first = generate_flight_offers(offers=20, max_segments=3, airports=8, seed=7)
+    second = generate_flight_offers(offers=20, max_segments=3, airports=8, seed=7)
+    routes = build_routes(first, convert_duration_to_minutes)
+
+    assert first == second
+    assert len(routes) == 20
+    for route in routes:
+        segments = route.segments
+        assert 1 <= len(segments) <= 3
+        assert (route.origin, route.destination) == (routes[0].origin, routes[0].destination)
+        for previous, following in zip(segments, segments[1:]):
+            assert previous.arrival_id == following.departure_id
+            assert previous.arrival_at < following.departure_at
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dijkstra_matches_bellman_ford_reference(seed):
+    routes = synthetic_routes(seed)
+    origin = routes[0].origin
+    destination = routes[0].destination
+
+    dist, predecessors = bellman_ford_distances(routes, origin)
+    best_route = dijkstra(routes, origin)
+
+    assert best_route.cost == pytest.approx(dist[destination])
+    assert best_route.route is predecessors[destination]
+    assert bellman_ford(routes, origin).destination == best_route.path[-1]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_pareto_front_matches_brute_force(seed):
+    routes = synthetic_routes(seed)
+    criteria = [(route.duration, route.price, route.stops) for route in routes]
+
+    def dominated(mine):
+        return any(other != mine and all(o <= m for o, m in zip(other, mine)) for other in criteria)
+
+    expected = {index for index, mine in enumerate(criteria)
+                if not dominated(mine) and criteria.index(mine) == index}
+    front = pareto_front(routes)
+
+    assert {id(route) for route in front} == {id(routes[index]) for index in expected}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_top_k_matches_python_scoring(seed):
+    routes = synthetic_routes(seed)
+    max_time = max(route.duration for route in routes)
+    max_price = max(route.price for route in routes)
+
+    expected = sorted(range(len(routes)), key=lambda index: (
+        routes[index].duration / max_time + routes[index].price / max_price, index))
+
+    assert top_k_routes(routes, 5) == [routes[index] for index in expected[:5]]
+
+
+@pytest.mark.parametrize('duration, minutes', [
+    ('PT2H30M', 150),
+    ('PT45M', 45),
+    ('PT3H', 180),
+    ('P1DT2H30M', 1590),
+    ('PT1H10M30S', 71),
+    ('PT0.5H', 30),
+    ('P1W', 7 * 24 * 60),
+    (95, 95),
+    (None, 0),
+    ('PT', 0),
+    ('2h30', 0),
+])
+def test_convert_duration_to_minutes(duration, minutes):
+    assert convert_duration_to_minutes(duration) == minutes
+
+
+def test_convert_durations_to_minutes_converts_batches():
+    parse_iso_duration.cache_clear()
+
+    minutes = convert_durations_to_minutes(['PT1H', 'PT2H', 'PT1H', 'PT1H'])
+
+    assert minutes == [60, 120, 60, 60]
+    # Every distinct string is parsed once, without going back to the cache for the repeats
+    assert parse_iso_duration.cache_info().misses == 2
+    assert parse_iso_duration.cache_info().hits == 0
+    assert convert_durations_to_minutes(['PT1H', 30, 'PT1H']) == [60, 30, 60]
+    assert convert_durations_to_minutes(np.array(['PT1H', 'P1DT2H', 'PT1H'])) == [60, 1560, 60]
+    # Equal values of different types are not merged
+    assert convert_durations_to_minutes([1, 1.0, 'PT1M']) == [1, 0, 1]
+
+
+class SlowFlightRepository:
+    def __init__(self, delays):
+        self.delays = delays
+
+        self.time_left = []
+
+    def get_flight_data(self, origin, destination, departure_date, adults=1):
+        self.time_left.append(remaining_time())
+        time.sleep(self.delays.get((origin, destination, departure_date), 0))
+        return {'data': [{'id': f'{origin}-{destination}-{departure_date}'}]}
+
+
+def test_date_window_and_combinations():
+    assert date_window('2026-11-02', 1) == ['2026-11-01', '2026-11-02', '2026-11-03']
+    assert search_combinations(['LHR', 'LGW'], ['CDG', 'LHR'], ['2026-11-02']) == [
+        ('LHR', 'CDG', '2026-11-02'), ('LGW', 'CDG', '2026-11-02'), ('LGW', 'LHR', '2026-11-02')]
+
+
+def test_search_flexible_runs_calls_concurrently_and_merges_offers():
+    delays = {(origin, 'CDG', day): 0.2 for origin in ('LHR', 'LGW') for day in date_window('2026-11-02', 1)}
+    started = time.perf_counter()
+
+    merged = search_flexible(SlowFlightRepository(delays), ['LHR', 'LGW'], ['CDG'], '2026-11-02', flex_days=1, max_workers=6)
+
+    assert time.perf_counter() - started < 0.6
+    assert len(merged['data']) == 6
+    assert all(search['error'] is None for search in merged['searches'])
+
+
+def test_search_flexible_gives_up_on_slow_calls():
+    repository = SlowFlightRepository({('LHR', 'CDG', '2026-11-02'): 1.0})
+
+    merged = search_flexible(repository, ['LHR', 'LGW'], ['CDG'], '2026-11-02', timeout=0.2)
+
+    assert [offer['id'] for offer in merged['data']] == ['LGW-CDG-2026-11-02']
+    errors = {search['origin']: search['error'] for search in merged['searches']}
+    assert 'timed out' in errors['LHR'] and errors['LGW'] is None
+    # Each call knows when it will be given up on, so it can stop retrying by then
+    assert all(0 < time_left <= 0.2 for time_left in repository.time_left)
+
+
+def test_build_routes_interns_airports_and_converts_once():
+    airport_codes = AirportCodes()
+    routes = build_routes(generate_flight_offers(offers=10, airports=6, seed=3), convert_duration_to_minutes,
+                          airport_codes, first_id=100)
+
+    assert [route.id for route in routes] == list(range(100, 110))
+    assert len(airport_codes) <= 6
+    for route in routes:
+        assert isinstance(route.price, float) and isinstance(route.duration, int)
+        for segment in route.segments:
+            assert airport_codes.codes[segment.departure_id] == segment.departure_code
+    assert routes[0].to_dict()['segments'][0]['departure']['iataCode'] == routes[0].origin
+    assert not hasattr(routes[0], '__dict__')
+
+
+def timed_route(*legs):
+    # legs: (departure, arrival, departure time, arrival time[, duration]) on 2026-11-02
+    segments = tuple(make_segment(leg[0], leg[1], departure_at=f'2026-11-02T{leg[2]}:00', arrival_at=f'2026-11-02T{leg[3]}:00',
+                                  duration=leg[4] if len(leg) > 4 else None) for leg in legs)
+    return Flight(segments[0].departure_code, segments[-1].arrival_code, 0, 100.0, segments, 'EUR')
+
+
+def test_earliest_arrival_respects_minimum_connection_time():
+    routes = [
+        timed_route(('MAD', 'LHR', '07:00', '08:30')),
+        timed_route(('LHR', 'JFK', '09:00', '11:00')),
+        timed_route(('LHR', 'JFK', '10:00', '12:30')),
+        timed_route(('MAD', 'JFK', '08:00', '13:00')),
+    ]
+
+    journey = earliest_arrival(routes, 'MAD', 'JFK')
+    assert journey.path == ['MAD', 'LHR', 'JFK']
+    assert journey.departure_at == '2026-11-02T07:00:00' and journey.arrival_at == '2026-11-02T12:30:00'
+    assert journey.minutes == 330
+
+    # 30 minutes are not enough at the default 45, but are at an airport configured for 20
+    assert earliest_arrival(routes, 'MAD', 'JFK', min_connection_minutes={'LHR': 20}).arrival_at == '2026-11-02T11:00:00'
+    assert earliest_arrival(routes, 'MAD', 'JFK', departure_after='2026-11-02T07:30:00').path == ['MAD', 'JFK']
+    assert earliest_arrival(routes, 'JFK', 'MAD') is None
+
+
+def test_connection_scan_compares_local_times_across_time_zones():
+    # Tokyo (UTC+9) 09:00 -> Los Angeles (UTC-7) 03:00 the same day after ten hours in the air
+    routes = [
+        timed_route(('HND', 'LAX', '09:00', '03:00', 'PT10H')),
+        timed_route(('LAX', 'JFK', '05:00', '13:30', 'PT5H30M')),
+        timed_route(('LAX', 'JFK', '03:30', '12:00', 'PT5H30M')),
+    ]
+
+    offsets = airport_offsets(segment for route in routes for segment in route.segments)
+    ids = AIRPORT_CODES.ids
+    assert offsets[ids['LAX']] - offsets[ids['HND']] == -16 * 60
+    assert offsets[ids['JFK']] - offsets[ids['LAX']] == 3 * 60
+
+    journey = earliest_arrival(routes, 'HND', 'JFK')
+    assert journey.path == ['HND', 'LAX', 'JFK']
+    assert journey.arrival_at == '2026-11-02T13:30:00'
+    assert journey.minutes == 10 * 60 + 2 * 60 + 5 * 60 + 30
+
+
+def test_departure_profile_keeps_only_useful_departures():
+    routes = [
+        timed_route(('MAD', 'LHR', '06:00', '07:30'), ('LHR', 'JFK', '09:00', '15:00')),
+        timed_route(('MAD', 'JFK', '07:00', '15:30')),
+        timed_route(('MAD', 'JFK', '08:00', '14:00')),
+        timed_route(('MAD', 'LHR', '10:00', '11:30'), ('LHR', 'JFK', '12:00', '18:00')),
+    ]
+
+    profile = departure_profile(routes, 'MAD', 'JFK')
+
+    # 06:00 and 07:00 arrive after the 08:00 departure does; 10:00 misses the 12:00 connection
+    assert [(journey.departure_at[11:16], journey.arrival_at[11:16]) for journey in profile] == [('08:00', '14:00')]
+    profile = departure_profile(routes, 'MAD', 'JFK', min_connection_minutes={'LHR': 30})
+    assert [journey.path for journey in profile] == [['MAD', 'LHR', 'JFK'], ['MAD', 'JFK']]
+
+
+def random_timetable(seed, legs=120, airports=8):
+    rng = random.Random(seed)
+    codes = [f'T{index:02d}' for index in range(airports)]
+    routes = []
+    for _ in range(legs):
+        departure, arrival = rng.sample(codes, 2)
+        departs = rng.randrange(0, 20 * 60, 5)
+        arrives = departs + rng.randrange(30, 240, 5)
+        if arrives >= 24 * 60:
+            continue
+        routes.append(timed_route((departure, arrival, f'{departs // 60:02d}:{departs % 60:02d}', f'{arrives // 60:02d}:{arrives % 60:02d}')))
+    return codes, routes
+
+
+def reference_arrival(connections, start, destination, min_connection, after, visited=()):
+    # Exhaustive search: earliest arrival at destination taking only legs that leave after `after` from start
+    best = float('inf')
+    for connection in connections:
+        if connection.departure_id != start or connection.departure_time < after or connection.arrival_id in visited:
+            continue
+        if connection.arrival_id == destination:
+            best = min(best, connection.arrival_time)
+        else:
+            best = min(best, reference_arrival(connections, connection.arrival_id, destination, min_connection,
+                                               connection.arrival_time + min_connection, visited + (start,)))
+    return best
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_connection_scan_matches_exhaustive_search(seed):
+    codes, routes = random_timetable(seed)
+    timetable = ConnectionTimetable(routes, default_min_connection=30)
+    ids = AIRPORT_CODES.ids
+    origin, destination = codes[0], codes[1]
+
+    journey = timetable.earliest_arrival(origin, destination)
+    expected = reference_arrival(timetable.connections, ids[origin], ids[destination], 30, float('-inf'))
+    assert (journey.arrival_time if journey else float('inf')) == expected
+
+    # Each profile entry is the best arrival for its departure time, and no later departure does as well
+    profile = timetable.profile(origin, destination)
+    for journey in profile:
+        assert journey.arrival_time == reference_arrival(
+            timetable.connections, ids[origin], ids[destination], 30, journey.departure_time)
+        for leg, next_leg in zip(journey.connections, journey.connections[1:]):
+            assert next_leg.departure_time >= leg.arrival_time + 30
+    departures = sorted({connection.departure_time for connection in timetable.connections if connection.departure_id == ids[origin]})
+    for departure in departures:
+        best = reference_arrival(timetable.connections, ids[origin], ids[destination], 30, departure)
+        answer = min((journey.arrival_time for journey in profile if journey.departure_time >= departure), default=float('inf'))
+        assert answer == best
@@ -0,0 +1,30 @@
+from frameworks.instrumentation import MetricsRegistry
+
+
+def test_histogram_exposes_cumulative_buckets():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram('search_seconds', 'Search latency.', ['route'], buckets=(0.1, 1.0))
+    latency.observe(0.05, 'MAD-BCN')
+    latency.observe(0.1, 'MAD-BCN')
+    latency.observe(3.0, 'MAD-BCN')
+
+    lines = metrics.expose().splitlines()
+
+    assert '# TYPE search_seconds histogram' in lines
+    assert 'search_seconds_bucket{route="MAD-BCN",le="0.1"} 2' in lines
+    assert 'search_seconds_bucket{route="MAD-BCN",le="1.0"} 2' in lines
+    assert 'search_seconds_bucket{route="MAD-BCN",le="+Inf"} 3' in lines
+    assert 'search_seconds_count{route="MAD-BCN"} 3' in lines
+
+
+def test_counter_and_stage_timer():
+    metrics = MetricsRegistry()
+    searches = metrics.counter('searches_total', 'Searches.', ['source'])
+    searches.inc('form')
+    searches.inc('form', amount=2)
+    with metrics.stage_timer('optimization'):
+        pass
+
+    assert searches.value('form') == 3
+    assert metrics.stage_seconds.count('optimization') == 1
+    assert 'searches_total{source="form"} 3' in metrics.expose()
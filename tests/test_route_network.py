@@ -0,0 +1,39 @@
+import os
+from repositories.airport_index import AirportIndex
+from repositories.openflights_route_network import RouteNetwork, promising_legs
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+
+def make_network():
+    index = AirportIndex(os.path.join(DATA, 'airports_sample.dat'))
+    return RouteNetwork(index, os.path.join(DATA, 'routes_sample.dat'))
+
+
+def test_network_keeps_distinct_non_stop_edges_between_known_airports():
+    network = make_network()
+
+    # Duplicate carriers, unknown airports and one-stop services are dropped; ICAO codes are resolved
+    assert network.edge_count == 16
+    assert network.destinations_from('MAD') == ['BCN', 'LHR', 'LGW', 'CDG', 'FRA']
+    assert network.destinations_from('XXX') == []
+
+
+def test_connections_lists_direct_one_and_two_stop_paths_shortest_first():
+    network = make_network()
+
+    paths = [connection['airports'] for connection in network.connections('MAD', 'JFK')]
+
+    # The two-stop path via Barcelona and Amsterdam is shorter than the one-stop path via Frankfurt
+    assert paths == [['MAD', 'LHR', 'JFK'], ['MAD', 'CDG', 'JFK'], ['MAD', 'BCN', 'AMS', 'JFK'], ['MAD', 'FRA', 'JFK']]
+    assert [connection['airports'] for connection in network.connections('MAD', 'JFK', max_stops=1)] == [
+        ['MAD', 'LHR', 'JFK'], ['MAD', 'CDG', 'JFK'], ['MAD', 'FRA', 'JFK']]
+    assert network.connections('JFK', 'LAX')[0] == {'airports': ['JFK', 'LAX'], 'distance_km': 3974.2}
+
+
+def test_promising_legs_deduplicates_legs():
+    network = make_network()
+
+    legs = promising_legs(network.connections('MAD', 'JFK', limit=2))
+
+    assert legs == [('MAD', 'LHR'), ('LHR', 'JFK'), ('MAD', 'CDG'), ('CDG', 'JFK')]
@@ -0,0 +1,70 @@
+from entities.flight import Flight
+from entities.segment import Segment
+
+
+class AirportCodes:
+    # Interns IATA codes to small integer ids so the optimizers hash ints instead of strings
+    def __init__(self):
+        self.ids = {}
+        self.codes = []
+
+    def intern(self, code):
+        airport_id = self.ids.get(code)
+        if airport_id is None:
+            airport_id = self.ids[code] = len(self.codes)
+            self.codes.append(code)
+        return airport_id
+
+    def __len__(self):
+        return len(self.codes)
+
+
+def iter_routes(offers, calculate_route_duration, airport_codes=None, first_id=0):
+    # One Flight per itinerary of every Amadeus flight offer, yielded as the offers arrive;
+    # the raw offers are walked only here and can be dropped as soon as they are converted
+    airport_codes = airport_codes if airport_codes is not None else AirportCodes()
+    route_id = first_id
+    for offer in offers:
+        price = float(offer['price']['total'])
+        currency = offer['price']['currency']
+        for itinerary in offer['itineraries']:
+            segments = []
+            for segment in itinerary['segments']:
+                departure = segment['departure']
+                arrival = segment['arrival']
+                segments.append(Segment(
+                    departure['iataCode'],
+                    arrival['iataCode'],
+                    airport_codes.intern(departure['iataCode']),
+                    airport_codes.intern(arrival['iataCode']),
+                    departure.get('at'),
+                    arrival.get('at'),
+                    segment.get('carrierCode'),
+                    segment.get('number'),
+                    segment.get('duration')
+                ))
+            yield Flight(
+                segments[0].departure_code,
+                segments[-1].arrival_code,
+                calculate_route_duration(itinerary['duration']),
+                price,
+                tuple(segments),
+                currency,
+                route_id
+            )
+            route_id += 1
+
+
+def build_routes(flight_data, calculate_route_duration, airport_codes=None, first_id=0):
+    return list(iter_routes(flight_data.get('data', []), calculate_route_duration, airport_codes, first_id))
+
+
+def flight_offers(flight_repository, origin, destination, departure_date, adults=1, document=None):
+    # Offers one at a time when the repository can stream them, otherwise from the whole response.
+    # The other members of the response, e.g. upstream errors, are copied into `document` when one is given.
+    if hasattr(flight_repository, 'iter_flight_offers'):
+        return flight_repository.iter_flight_offers(origin, destination, departure_date, adults, document)
+    flight_data = flight_repository.get_flight_data(origin, destination, departure_date, adults)
+    if document is not None:
+        document.update((key, value) for key, value in flight_data.items() if key != 'data')
+    return iter(flight_data.get('data', []))
@@ -1,15 +1,54 @@
+import logging
+import re
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_NUMBER = r'(\d+(?:[.,]\d+)?)'
+# PnYnMnWnDTnHnMnS; every part is optional but at least one must be present
+_ISO_8601_DURATION = re.compile(
+    rf'P(?:{_NUMBER}Y)?(?:{_NUMBER}M)?(?:{_NUMBER}W)?(?:{_NUMBER}D)?'
+    rf'(?:T(?=\d)(?:{_NUMBER}H)?(?:{_NUMBER}M)?(?:{_NUMBER}S)?)?'
+)
+# Minutes per component, in the order of the groups above; years and months use nominal lengths
+_COMPONENT_MINUTES = (365 * 24 * 60, 30 * 24 * 60, 7 * 24 * 60, 24 * 60, 60, 1, 1 / 60)
+
+# Amadeus repeats a few hundred distinct duration strings, so a small cache covers them all
+DURATION_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=DURATION_CACHE_SIZE)
+def parse_iso_duration(duration):
+    match = _ISO_8601_DURATION.fullmatch(duration.strip().upper())
+    if match is None or duration.strip().upper() in ('P', 'PT'):
+        raise ValueError(f"Invalid ISO-8601 duration: {duration!r}")
+
+    minutes = 0
+    for value, component_minutes in zip(match.groups(), _COMPONENT_MINUTES):
+        if value:
+            minutes += float(value.replace(',', '.')) * component_minutes
+    return int(minutes + 0.5)
+
+
 def convert_duration_to_minutes(duration):
     if isinstance(duration, str):
-        hours = 0
-        minutes = 0
-        if 'H' in duration:
-            hours = int(duration.split('H')[0].replace('PT', ''))
-            if 'M' in duration:
-                minutes = int(duration.split('H')[1].replace('M', ''))
-        elif 'M' in duration:
-            minutes = int(duration.replace('PT', '').replace('M', ''))
-        return hours * 60 + minutes
+        try:
+            return parse_iso_duration(duration)
+        except ValueError:
+            logger.warning("Could not parse duration %r", duration)
+            return 0
     elif isinstance(duration, int):
         return duration
     else:
         return 0
+
+
+def convert_durations_to_minutes(durations):
+    # Each distinct string is converted once and the results are mapped back onto the batch, with no
+    # Python call per element. A str never equals a number, so when every distinct value is a string
+    # no other value was merged into one of them; anything else is converted one by one.
+    distinct = set(durations)
+    if not all(isinstance(duration, str) for duration in distinct):
+        return [convert_duration_to_minutes(duration) for duration in durations]
+    converted = {duration: convert_duration_to_minutes(duration) for duration in distinct}
+    return list(map(converted.__getitem__, durations))
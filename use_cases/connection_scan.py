@@ -0,0 +1,255 @@
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from use_cases.calculate_route_duration import convert_duration_to_minutes
+
+DEFAULT_MIN_CONNECTION_MINUTES = 45
+
+_EPOCH = datetime(1970, 1, 1)
+_INFINITY = float('inf')
+
+
+@lru_cache(maxsize=4096)
+def local_minutes(timestamp):
+    # Amadeus times are local to each airport and carry no UTC offset
+    return int((datetime.fromisoformat(timestamp) - _EPOCH).total_seconds() // 60)
+
+
+def airport_offsets(segments):
+    # Relative UTC offset of every airport, in minutes. A segment's local arrival minus local departure
+    # minus its flying time is the offset difference between its two airports; offsets are spread from
+    # the first airport of each connected group, so all times can be compared on one clock.
+    differences = {}
+    for segment in segments:
+        flying_minutes = convert_duration_to_minutes(segment.duration)
+        if not flying_minutes or not segment.departure_at or not segment.arrival_at:
+            continue
+        difference = local_minutes(segment.arrival_at) - local_minutes(segment.departure_at) - flying_minutes
+        differences.setdefault(segment.departure_id, []).append((segment.arrival_id, difference))
+        differences.setdefault(segment.arrival_id, []).append((segment.departure_id, -difference))
+
+    offsets = {}
+    for start in differences:
+        if start in offsets:
+            continue
+        offsets[start] = 0
+        pending = [start]
+        while pending:
+            airport = pending.pop()
+            for neighbour, difference in differences[airport]:
+                if neighbour not in offsets:
+                    offsets[neighbour] = offsets[airport] + difference
+                    pending.append(neighbour)
+    return offsets
+
+
+class Connection:
+    # One flight leg with times in minutes on the shared clock
+    __slots__ = ('departure_id', 'arrival_id', 'departure_time', 'arrival_time', 'segment', 'route_index')
+
+    def __init__(self, departure_id, arrival_id, departure_time, arrival_time, segment, route_index):
+        self.departure_id = departure_id
+        self.arrival_id = arrival_id
+        self.departure_time = departure_time
+        self.arrival_time = arrival_time
+        self.segment = segment
+        self.route_index = route_index
+
+
+class Journey:
+    # Legs that can actually be flown one after the other, possibly taken from different offers
+    __slots__ = ('connections', 'departure_time', 'arrival_time')
+
+    def __init__(self, connections):
+        self.connections = connections
+        self.departure_time = connections[0].departure_time
+        self.arrival_time = connections[-1].arrival_time
+
+    @property
+    def segments(self):
+        return [connection.segment for connection in self.connections]
+
+    @property
+    def path(self):
+        return [self.connections[0].segment.departure_code] + [connection.segment.arrival_code for connection in self.connections]
+
+    @property
+    def departure_at(self):
+        return self.connections[0].segment.departure_at
+
+    @property
+    def arrival_at(self):
+        return self.connections[-1].segment.arrival_at
+
+    @property
+    def minutes(self):
+        # Door to door, time zones already accounted for
+        return self.arrival_time - self.departure_time
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'departure_at': self.departure_at,
+            'arrival_at': self.arrival_at,
+            'minutes': self.minutes,
+            'segments': [segment.to_dict() for segment in self.segments]
+        }
+
+
+class ConnectionTimetable:
+    # Connection Scan over every segment of a search: one pass over the legs sorted by departure answers a query
+    def __init__(self, routes, min_connection_minutes=None, default_min_connection=DEFAULT_MIN_CONNECTION_MINUTES):
+        segments = [segment for route in routes for segment in route.segments]
+        offsets = airport_offsets(segments)
+
+        self.airport_ids = {}
+        self._first_departures = {route.segments[0].departure_id for route in routes}
+        self._last_arrivals = {route.segments[-1].arrival_id for route in routes}
+        connections = []
+        # The same physical flight is usually sold in many offers; it is one connection
+        seen = set()
+        for route_index, route in enumerate(routes):
+            for segment in route.segments:
+                self.airport_ids[segment.departure_code] = segment.departure_id
+                self.airport_ids[segment.arrival_code] = segment.arrival_id
+                if not segment.departure_at or not segment.arrival_at:
+                    continue
+                key = (segment.departure_id, segment.arrival_id, segment.departure_at, segment.arrival_at,
+                       segment.carrier_code, segment.number)
+                if key in seen:
+                    continue
+                seen.add(key)
+                connections.append(Connection(
+                    segment.departure_id,
+                    segment.arrival_id,
+                    local_minutes(segment.departure_at) - offsets.get(segment.departure_id, 0),
+                    local_minutes(segment.arrival_at) - offsets.get(segment.arrival_id, 0),
+                    segment,
+                    route_index
+                ))
+        connections.sort(key=lambda connection: (connection.departure_time, connection.arrival_time))
+        self.connections = connections
+        self._offsets = offsets
+
+        self.default_min_connection = default_min_connection
+        self._min_connection = {}
+        for code, minutes in (min_connection_minutes or {}).items():
+            if code in self.airport_ids:
+                self._min_connection[self.airport_ids[code]] = minutes
+
+    def __len__(self):
+        return len(self.connections)
+
+    def min_connection(self, airport_id):
+        return self._min_connection.get(airport_id, self.default_min_connection)
+
+    def _airports(self, code, route_ends):
+        # City codes such as LON stand for the first departure or last arrival of every itinerary
+        if code in self.airport_ids:
+            return {self.airport_ids[code]}
+        return route_ends
+
+    def earliest_arrival(self, origin, destination, departure_after=None):
+        origins = self._airports(origin, self._first_departures)
+        destinations = self._airports(destination, self._last_arrivals)
+        if departure_after is None:
+            start = {airport: -_INFINITY for airport in origins}
+        else:
+            # departure_after is a local time at the origin airport
+            start = {airport: local_minutes(departure_after) - self._offsets.get(airport, 0) for airport in origins}
+
+        # Earliest arrival per airport, the time a connecting flight can be boarded there, and the leg used
+        arrival = dict(start)
+        ready = dict(start)
+        reached_by = {}
+        best_arrival = _INFINITY
+        for connection in self.connections:
+            if connection.departure_time >= best_arrival:
+                break
+            if ready.get(connection.departure_id, _INFINITY) > connection.departure_time:
+                continue
+            airport = connection.arrival_id
+            if connection.arrival_time < arrival.get(airport, _INFINITY):
+                arrival[airport] = connection.arrival_time
+                ready[airport] = connection.arrival_time + self.min_connection(airport)
+                reached_by[airport] = connection
+                if airport in destinations:
+                    best_arrival = connection.arrival_time
+
+        reached = [airport for airport in destinations if airport in reached_by and airport not in origins]
+        if not reached:
+            return None
+        airport = min(reached, key=lambda airport: arrival[airport])
+        legs = []
+        while airport not in origins:
+            connection = reached_by[airport]
+            legs.append(connection)
+            airport = connection.departure_id
+        legs.reverse()
+        return Journey(legs)
+
+    def profile(self, origin, destination):
+        # Every departure from the origin with the earliest arrival it allows, latest departure first;
+        # a departure that lands no earlier than a later one is dropped
+        origins = self._airports(origin, self._first_departures)
+        destinations = self._airports(destination, self._last_arrivals)
+
+        # Per airport: entries (departure time, arrival at destination, connection, next entry) with departure and
+        # arrival both decreasing, and the negated departures for bisecting
+        entries = {}
+        departures = {}
+        for connection in reversed(self.connections):
+            if connection.departure_id in destinations:
+                continue
+            arrival_time = connection.arrival_time if connection.arrival_id in destinations else _INFINITY
+            next_entry = None
+            onward = entries.get(connection.arrival_id)
+            if onward and connection.arrival_id not in destinations:
+                # Latest-added entry still catchable after the minimum connection time arrives first
+                ready = connection.arrival_time + self.min_connection(connection.arrival_id)
+                position = bisect_right(departures[connection.arrival_id], -ready)
+                if position:
+                    next_entry = onward[position - 1]
+                    arrival_time = next_entry[1]
+            if arrival_time == _INFINITY:
+                continue
+
+            airport = connection.departure_id
+            airport_entries = entries.setdefault(airport, [])
+            airport_departures = departures.setdefault(airport, [])
+            if airport_entries and arrival_time >= airport_entries[-1][1]:
+                continue
+            entry = (connection.departure_time, arrival_time, connection, next_entry)
+            if airport_entries and airport_entries[-1][0] == connection.departure_time:
+                airport_entries[-1] = entry
+            else:
+                airport_entries.append(entry)
+                airport_departures.append(-connection.departure_time)
+
+        journeys = []
+        for airport in origins:
+            for entry in entries.get(airport, ()):
+                legs = []
+                while entry is not None:
+                    legs.append(entry[2])
+                    entry = entry[3]
+                journeys.append(Journey(legs))
+        journeys.sort(key=lambda journey: (-journey.departure_time, journey.arrival_time))
+        # With several origin airports the merged list needs the dominance filter once more
+        profile = []
+        for journey in journeys:
+            if not profile or journey.arrival_time < profile[-1].arrival_time:
+                profile.append(journey)
+        return profile
+
+
+def earliest_arrival(routes, origin, destination, departure_after=None, min_connection_minutes=None):
+    if not routes:
+        return None
+    return ConnectionTimetable(routes, min_connection_minutes).earliest_arrival(origin, destination, departure_after)
+
+
+def departure_profile(routes, origin, destination, min_connection_minutes=None):
+    if not routes:
+        return []
+    return ConnectionTimetable(routes, min_connection_minutes).profile(origin, destination)
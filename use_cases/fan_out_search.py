@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from interfaces.flight_repository import deadline
+
+DEFAULT_MAX_WORKERS = 8
+# Seconds a single upstream call may run, retries and rate limiting included, before its result is given up on.
+# The call itself is told the same deadline, so it stops retrying instead of spending quota nobody waits for.
+DEFAULT_CALL_TIMEOUT = 20
+
+
+def date_window(departure_date, flex_days=0):
+    center = datetime.strptime(departure_date, '%Y-%m-%d')
+    return [(center + timedelta(days=offset)).strftime('%Y-%m-%d') for offset in range(-flex_days, flex_days + 1)]
+
+
+def parse_airport_codes(value):
+    return [code.strip().upper() for code in value.split(',') if code.strip()]
+
+
+def upstream_error(flight_data):
+    # Message of the first error of an Amadeus error payload, None for a successful response
+    errors = flight_data.get('errors') if flight_data else None
+    if not errors:
+        return None
+    error = errors[0]
+    if isinstance(error, dict):
+        return error.get('detail') or error.get('title') or error
+    return error
+
+
+def search_combinations(origins, destinations, dates):
+    return [(origin, destination, departure_date)
+            for departure_date in dates
+            for origin in origins
+            for destination in destinations
+            if origin != destination]
+
+
+def iter_search_results(flight_repository, combinations, max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_CALL_TIMEOUT):
+    # Yields (combination, flight_data, error) in completion order, not submission order
+    started = {}
+
+    def call(combination):
+        started[combination] = time.monotonic()
+        with deadline(timeout):
+            return flight_repository.get_flight_data(*combination)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        pending = {executor.submit(call, combination): combination for combination in combinations}
+        while pending:
+            now = time.monotonic()
+            deadlines = [started[combination] + timeout for combination in pending.values() if combination in started]
+            wait_for = max(min(deadlines) - now, 0) if deadlines else timeout
+            done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                combination = pending.pop(future)
+                error = future.exception()
+                if error is not None:
+                    yield combination, None, error
+                else:
+                    yield combination, future.result(), None
+
+            # Calls still queued behind the pool limit have not started, so only running ones can time out
+            now = time.monotonic()
+            for future, combination in list(pending.items()):
+                if combination in started and now - started[combination] >= timeout and not future.done():
+                    del pending[future]
+                    yield combination, None, TimeoutError(f"Search {combination} timed out after {timeout}s")
+    finally:
+        # Timed out calls keep their worker until the upstream returns, but nobody waits for them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def search_flexible(flight_repository, origins, destinations, departure_date, flex_days=0,
+                    max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_CALL_TIMEOUT):
+    combinations = search_combinations(origins, destinations, date_window(departure_date, flex_days))
+
+    merged = {'data': [], 'searches': []}
+    for (origin, destination, search_date), flight_data, error in iter_search_results(
+            flight_repository, combinations, max_workers, timeout):
+        offers = flight_data.get('data', []) if flight_data else []
+        if error is None:
+            error = upstream_error(flight_data)
+        merged['data'].extend(offers)
+        merged['searches'].append({
+            'origin': origin,
+            'destination': destination,
+            'date': search_date,
+            'offers': len(offers),
+            'error': str(error) if error is not None else None
+        })
+    return merged
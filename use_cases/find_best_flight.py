@@ -1,12 +1,17 @@
-def bellman_ford(routes, origin):
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def bellman_ford_distances(routes, origin):
     dist = {}
     predecessors = {}
 
     # Initialize all airports in the graph
     for route in routes:
-        for segment in route['segments']:
-            departure = segment['departure']['iataCode']
-            arrival = segment['arrival']['iataCode']
+        for segment in route.segments:
+            departure = segment.departure_code
+            arrival = segment.arrival_code
             if departure not in dist:
                 dist[departure] = float('inf')
                 predecessors[departure] = None
@@ -17,33 +22,36 @@ def bellman_ford(routes, origin):
     # Distance to origin is 0
     dist[origin] = 0
 
-    valid_duration = [float(route.get('duration', 0)) for route in routes if 'duration' in route]
+    valid_duration = [float(route.duration) for route in routes if route.duration is not None]
     if not valid_duration:
-        print("No valid durations found")
+        logger.warning("No valid durations found")
         return None
 
     # Find maximum time and price for normalization
-    max_time = max(float(route.get('duration', 0)) for route in routes if 'duration' in route)
-    max_price = max(float(route.get('price', 0)) for route in routes if 'price' in route)
+    max_time = max(valid_duration)
+    max_price = max(float(route.price or 0) for route in routes)
+
+    logger.debug("max_time: %s, max_price: %s", max_time, max_price)
 
-    print(f"max_time: {max_time}, max_price: {max_price}")  # This prints the max time and price
+    # Checked once: formatting two messages per relaxation is the dominant cost when logging is off
+    debug = logger.isEnabledFor(logging.DEBUG)
 
     # Relaxation of edges
     for _ in range(len(dist) - 1):
         for route in routes:
-            for segment in route['segments']:
-                source = segment['departure']['iataCode']
-                destination = segment['arrival']['iataCode']
+            for segment in route.segments:
+                source = segment.departure_code
+                destination = segment.arrival_code
 
-                # Convert 'duration' to minutes and 'price' to float
-                duration = route.get('duration', 0)
-                price = route.get('price', '0')
+                duration = route.duration or 0
+                price = route.price or 0
 
                 # Convert duration and price to numbers
                 weight = float(duration)
                 price = float(price)
 
-                print(f"Processing route: {source} -> {destination}, weight = {weight}, price = {price}")
+                if debug:
+                    logger.debug("Processing route: %s -> %s, weight = %s, price = %s", source, destination, weight, price)
 
                 # Normalize time and price
                 normalized_time = weight / max_time
@@ -52,14 +60,25 @@ def bellman_ford(routes, origin):
                 # Adjusted formula: sum the normalized time and price
                 combined_weight = normalized_time + normalized_price
 
-                print(f"Route {source} -> {destination}: duration = {weight} min (normalized: {normalized_time}), price = {price} EUR (normalized: {normalized_price}), combined weight = {combined_weight}")
+                if debug:
+                    logger.debug("Route %s -> %s: duration = %s min (normalized: %s), price = %s EUR (normalized: %s), combined weight = %s",
+                                 source, destination, weight, normalized_time, price, normalized_price, combined_weight)
 
                 if dist[source] + combined_weight < dist[destination]:
                     dist[destination] = dist[source] + combined_weight
                     predecessors[destination] = route
 
+    return dist, predecessors
+
+
+def bellman_ford(routes, origin):
+    distances = bellman_ford_distances(routes, origin)
+    if distances is None:
+        return None
+    dist, _ = distances
+
     # Get the best route with the least combined weight
-    best_route = min(routes, key=lambda x: dist.get(x['segments'][-1]['arrival']['iataCode'], float('inf')))
+    best_route = min(routes, key=lambda x: dist.get(x.destination, float('inf')))
 
-    print("Best route selected:", best_route)  # This prints the best route selected
+    logger.debug("Best route selected: %s", best_route)
     return best_route
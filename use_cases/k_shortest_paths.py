@@ -0,0 +1,155 @@
+import heapq
+from itertools import count
+from use_cases.shortest_path import BestRoute, build_route_graph, route_endpoints, route_weights
+
+DEFAULT_ALTERNATIVES = 5
+
+# Virtual airport linked to every source, so city codes with several departure airports are one search
+_SOURCE = -1
+
+
+def _reverse_tree(graph, targets):
+    # Dijkstra from the targets over reversed edges: distance to the nearest target and the next edge towards it
+    reverse = {}
+    for airport, edges in graph.items():
+        for position, (arrival, weight, _, _) in enumerate(edges):
+            reverse.setdefault(arrival, []).append((airport, weight, position))
+
+    remaining = {target: 0 for target in targets}
+    next_edge = {target: None for target in targets}
+    heap = [(0, target) for target in targets]
+    heapq.heapify(heap)
+    settled = set()
+    while heap:
+        cost, airport = heapq.heappop(heap)
+        if airport in settled:
+            continue
+        settled.add(airport)
+        for departure, weight, position in reverse.get(airport, ()):
+            new_cost = cost + weight
+            if new_cost < remaining.get(departure, float('inf')):
+                remaining[departure] = new_cost
+                next_edge[departure] = (departure, position)
+                heapq.heappush(heap, (new_cost, departure))
+    return remaining, next_edge
+
+
+class KShortestPaths:
+    # Yen's k shortest loopless paths. The reverse shortest-path tree is computed once: its distances are
+    # exact A* potentials for every spur search, and when the tree path from a spur airport avoids the removed
+    # edges and the root airports it is the spur path, so no search runs at all.
+    def __init__(self, graph, sources, targets):
+        self.graph = dict(graph)
+        self.targets = set(targets)
+        self.graph[_SOURCE] = [(source, 0, None, None) for source in sources if source not in self.targets]
+        self.remaining, self.next_edge = _reverse_tree(self.graph, self.targets)
+        self.searches = 0
+
+    def edge(self, key):
+        airport, position = key
+        return self.graph[airport][position]
+
+    def _tree_path(self, spur, removed_edges, removed_airports):
+        edges = []
+        airport = spur
+        while airport not in self.targets:
+            key = self.next_edge.get(airport)
+            if key is None or key in removed_edges:
+                return None
+            edges.append(key)
+            airport = self.edge(key)[0]
+            if airport in removed_airports:
+                return None
+        return edges
+
+    def _spur_path(self, spur, removed_edges, removed_airports):
+        if self.remaining.get(spur) is None:
+            return None
+        edges = self._tree_path(spur, removed_edges, removed_airports)
+        if edges is not None:
+            return self.remaining[spur], edges
+
+        # A* guided by the distances of the reverse tree, which removing edges can only make longer
+        self.searches += 1
+        costs = {spur: 0}
+        reached_by = {spur: None}
+        heap = [(self.remaining[spur], 0, spur)]
+        settled = set()
+        while heap:
+            _, cost, airport = heapq.heappop(heap)
+            if airport in settled:
+                continue
+            settled.add(airport)
+            if airport in self.targets:
+                edges = []
+                while reached_by[airport] is not None:
+                    edges.append(reached_by[airport])
+                    airport = reached_by[airport][0]
+                edges.reverse()
+                return cost, edges
+            for position, (arrival, weight, _, _) in enumerate(self.graph.get(airport, ())):
+                key = (airport, position)
+                if arrival in removed_airports or key in removed_edges or arrival not in self.remaining:
+                    continue
+                new_cost = cost + weight
+                if new_cost < costs.get(arrival, float('inf')):
+                    costs[arrival] = new_cost
+                    reached_by[arrival] = key
+                    heapq.heappush(heap, (new_cost + self.remaining[arrival], new_cost, arrival))
+        return None
+
+    def _airports(self, edges):
+        return [_SOURCE] + [self.edge(key)[0] for key in edges]
+
+    def paths(self, k):
+        # Up to k (cost, edges) pairs, cheapest first; edges are (airport, position) keys into the graph
+        first = self._spur_path(_SOURCE, set(), set())
+        if first is None or k <= 0:
+            return []
+        found = [first]
+        candidates = []
+        queued = {tuple(first[1])}
+        tie_breaker = count()
+
+        while len(found) < k:
+            cost, edges = found[-1]
+            airports = self._airports(edges)
+            root_cost = 0
+            for index in range(len(edges)):
+                root = edges[:index]
+                # Edges already used by a found path that shares this root must not be taken again
+                removed_edges = {path[index] for _, path in found if len(path) > index and path[:index] == root}
+                removed_airports = set(airports[:index])
+                spur = self._spur_path(airports[index], removed_edges, removed_airports)
+                if spur is not None:
+                    spur_cost, spur_edges = spur
+                    path = root + spur_edges
+                    if tuple(path) not in queued:
+                        queued.add(tuple(path))
+                        heapq.heappush(candidates, (root_cost + spur_cost, next(tie_breaker), path))
+                root_cost += self.edge(edges[index])[1]
+            if not candidates:
+                break
+            cost, _, path = heapq.heappop(candidates)
+            found.append((cost, path))
+        return found
+
+
+def k_shortest_routes(routes, origin, destination=None, k=DEFAULT_ALTERNATIVES):
+    # The k best itineraries through the segment graph, each a BestRoute like dijkstra's answer
+    if not routes:
+        return []
+
+    weights = route_weights(routes)
+    graph = build_route_graph(routes, weights)
+    sources, targets = route_endpoints(routes, origin, destination)
+
+    search = KShortestPaths(graph, sources, targets)
+    alternatives = []
+    for cost, edges in search.paths(k):
+        # The first edge leaves the virtual source
+        legs = [search.edge(key) for key in edges[1:]]
+        segments = [segment for _, _, _, segment in legs]
+        airports = [segments[0].departure_code] + [segment.arrival_code for segment in segments]
+        alternatives.append(BestRoute(routes[legs[-1][2]], airports, segments, cost))
+    return alternatives
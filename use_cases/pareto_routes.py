@@ -0,0 +1,48 @@
+
+
+def route_criteria(route):
+    return float(route.duration or 0), float(route.price or 0), route.stops
+
+
+def pareto_front(routes):
+    # Labels are settled in lexicographic (duration, price, stops) order, so any label that could
+    # dominate another is settled before it. A label is dominated iff a settled label with no more
+    # stops is at most as expensive; cheapest_by_stops[k] holds the lowest settled price with <= k stops.
+    labels = sorted((route_criteria(route), index) for index, route in enumerate(routes))
+
+    cheapest_by_stops = []
+    front = []
+    for (duration, price, stops), index in labels:
+        while len(cheapest_by_stops) <= stops:
+            cheapest_by_stops.append(cheapest_by_stops[-1] if cheapest_by_stops else float('inf'))
+        if cheapest_by_stops[stops] <= price:
+            continue
+        front.append(routes[index])
+        for more_stops in range(stops, len(cheapest_by_stops)):
+            cheapest_by_stops[more_stops] = min(cheapest_by_stops[more_stops], price)
+    return front
+
+
+def pareto_itineraries(routes):
+    front = pareto_front(routes)
+    if not front:
+        return None
+
+    criteria = [route_criteria(route) for route in front]
+    max_time = max(duration for duration, _, _ in criteria) or 1
+    max_price = max(price for _, price, _ in criteria) or 1
+
+    def balance(position):
+        duration, price, stops = criteria[position]
+        return duration / max_time + price / max_price, stops
+
+    fastest = min(range(len(front)), key=lambda position: criteria[position])
+    cheapest = min(range(len(front)), key=lambda position: (criteria[position][1], criteria[position][0]))
+    best_balance = min(range(len(front)), key=balance)
+
+    return {
+        'fastest': front[fastest],
+        'cheapest': front[cheapest],
+        'best_balance': front[best_balance],
+        'front': front
+    }
@@ -0,0 +1,52 @@
+import math
+from functools import lru_cache
+
+GREAT_CIRCLE_POINTS = 64
+
+
+def _to_vector(latitude, longitude):
+    phi, lam = math.radians(latitude), math.radians(longitude)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+@lru_cache(maxsize=4096)
+def great_circle_points(lat1, lon1, lat2, lon2, points=GREAT_CIRCLE_POINTS):
+    # Spherical linear interpolation between both airports, as (lon, lat) pairs like GeoJSON
+    start = _to_vector(lat1, lon1)
+    end = _to_vector(lat2, lon2)
+    angle = math.acos(max(-1.0, min(1.0, sum(a * b for a, b in zip(start, end)))))
+    if angle < 1e-9:
+        return ((lon1, lat1), (lon2, lat2))
+
+    coordinates = []
+    previous_longitude = lon1
+    for step in range(points + 1):
+        fraction = step / points
+        a = math.sin((1 - fraction) * angle) / math.sin(angle)
+        b = math.sin(fraction * angle) / math.sin(angle)
+        x, y, z = (a * s + b * e for s, e in zip(start, end))
+        latitude = math.degrees(math.atan2(z, math.hypot(x, y)))
+        longitude = math.degrees(math.atan2(y, x))
+        # Keep longitudes continuous across the antimeridian so the line is drawn without a jump
+        longitude += 360 * round((previous_longitude - longitude) / 360)
+        previous_longitude = longitude
+        coordinates.append((round(longitude, 5), round(latitude, 5)))
+    return tuple(coordinates)
+
+
+def route_geometry(airports):
+    # airports: [(IATA code, latitude, longitude)] in travel order
+    features = []
+    for (origin, lat1, lon1), (destination, lat2, lon2) in zip(airports, airports[1:]):
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'LineString', 'coordinates': [list(point) for point in great_circle_points(lat1, lon1, lat2, lon2)]},
+            'properties': {'origin': origin, 'destination': destination}
+        })
+    for position, (code, latitude, longitude) in enumerate(airports):
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': [longitude, latitude]},
+            'properties': {'iata': code, 'position': position}
+        })
+    return {'type': 'FeatureCollection', 'features': features}
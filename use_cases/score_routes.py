@@ -0,0 +1,108 @@
+import numpy as np
+
+CRITERIA = ('duration', 'price', 'stops', 'segments')
+# Same trade-off as bellman_ford: normalized time plus normalized price
+DEFAULT_WEIGHTS = {'duration': 1.0, 'price': 1.0, 'stops': 0.0, 'segments': 0.0}
+
+
+def weight_vector(weights=None):
+    weights = DEFAULT_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(CRITERIA)
+    if unknown:
+        raise ValueError(f"Unknown scoring criteria: {', '.join(sorted(unknown))}")
+    vector = np.array([float(weights.get(criterion, 0)) for criterion in CRITERIA])
+    if not np.isfinite(vector).all():
+        raise ValueError("Scoring weights must be finite numbers")
+    return vector
+
+
+class RouteMatrix:
+    def __init__(self, values):
+        # One row per candidate route, one column per entry of CRITERIA
+        self.values = np.asarray(values, dtype=np.float64).reshape(-1, len(CRITERIA))
+
+    @classmethod
+    def from_routes(cls, routes):
+        values = np.empty((len(routes), len(CRITERIA)))
+        for row, route in enumerate(routes):
+            segment_count = len(route.segments)
+            values[row] = (float(route.duration or 0), float(route.price or 0), segment_count - 1, segment_count)
+        return cls(values)
+
+    @classmethod
+    def concatenate(cls, matrices):
+        return cls(np.concatenate([matrix.values for matrix in matrices]))
+
+    def __len__(self):
+        return len(self.values)
+
+    def scores(self, weights=None):
+        if not len(self.values):
+            return np.empty(0)
+        maxima = self.values.max(axis=0)
+        maxima[maxima == 0] = 1
+        return (self.values / maxima) @ weight_vector(weights)
+
+    def top_k(self, k, weights=None, rows=None, scores=None):
+        # rows restricts the ranking to a subset; scores can be passed in when already computed
+        scores = self.scores(weights) if scores is None else scores
+        pool = np.arange(len(scores)) if rows is None else np.asarray(rows, dtype=np.intp)
+        k = min(k, len(pool))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < len(pool):
+            candidates = pool[np.argpartition(scores[pool], k - 1)[:k]]
+        else:
+            candidates = pool
+        # Only the k selected rows are sorted; ties keep their original order
+        order = np.lexsort((candidates, scores[candidates]))
+        return candidates[order]
+
+
+class CandidateRoutes:
+    # The routes of one search with everything needed to re-rank them: only scoring runs per request
+    def __init__(self, routes):
+        self.routes = routes
+        self.matrix = RouteMatrix.from_routes(routes)
+        # Segments flown by each carrier, per route
+        self._carrier_segments = {}
+        for row, route in enumerate(routes):
+            for segment in route.segments:
+                counts = self._carrier_segments.get(segment.carrier_code)
+                if counts is None:
+                    counts = self._carrier_segments[segment.carrier_code] = np.zeros(len(routes), dtype=np.int32)
+                counts[row] += 1
+
+    def __len__(self):
+        return len(self.routes)
+
+    @property
+    def carriers(self):
+        return sorted(carrier for carrier in self._carrier_segments if carrier)
+
+    def rows(self, max_stops=None, carriers=None, exclude_carriers=None):
+        # Rows left after the filters: at most max_stops stops, only the given carriers, none of the excluded ones
+        keep = np.ones(len(self.routes), dtype=bool)
+        if max_stops is not None:
+            keep &= self.matrix.values[:, CRITERIA.index('stops')] <= max_stops
+        if carriers:
+            allowed = np.zeros(len(self.routes), dtype=np.int32)
+            for carrier in set(carriers):
+                if carrier in self._carrier_segments:
+                    allowed += self._carrier_segments[carrier]
+            keep &= allowed == self.matrix.values[:, CRITERIA.index('segments')]
+        for carrier in set(exclude_carriers or ()):
+            if carrier in self._carrier_segments:
+                keep &= self._carrier_segments[carrier] == 0
+        return np.flatnonzero(keep)
+
+    def rank(self, k=None, weights=None, max_stops=None, carriers=None, exclude_carriers=None):
+        # (route, score) pairs, best first; scores stay normalized over every candidate of the search
+        scores = self.matrix.scores(weights)
+        rows = self.rows(max_stops, carriers, exclude_carriers)
+        k = len(rows) if k is None else k
+        return [(self.routes[row], float(scores[row])) for row in self.matrix.top_k(k, rows=rows, scores=scores)]
+
+
+def top_k_routes(routes, k, weights=None):
+    return [routes[row] for row in RouteMatrix.from_routes(routes).top_k(k, weights)]
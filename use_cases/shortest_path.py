@@ -0,0 +1,121 @@
+import heapq
+
+
+class BestRoute:
+    # The chosen Flight plus the shortest path found through the segment graph
+    __slots__ = ('route', 'path', 'path_segments', 'cost')
+
+    def __init__(self, route, path, path_segments, cost):
+        self.route = route
+        self.path = path
+        self.path_segments = path_segments
+        self.cost = cost
+
+    def __getattr__(self, name):
+        # duration, price, segments, ... are read from the chosen Flight
+        return getattr(self.route, name)
+
+
+def route_weights(routes):
+    # Combined weight per route: normalized duration + normalized price, as in bellman_ford
+    durations = [float(route.duration or 0) for route in routes]
+    prices = [float(route.price or 0) for route in routes]
+    max_time = max(durations, default=0)
+    max_price = max(prices, default=0)
+
+    weights = []
+    for duration, price in zip(durations, prices):
+        normalized_time = duration / max_time if max_time else 0
+        normalized_price = price / max_price if max_price else 0
+        weights.append(normalized_time + normalized_price)
+    return weights
+
+
+def build_route_graph(routes, weights=None):
+    # Adjacency list airport id -> [(next airport id, weight, route index, segment)], built once per search
+    if weights is None:
+        weights = route_weights(routes)
+
+    graph = {}
+    for route_index, (route, weight) in enumerate(zip(routes, weights)):
+        for segment in route.segments:
+            graph.setdefault(segment.departure_id, []).append((segment.arrival_id, weight, route_index, segment))
+            graph.setdefault(segment.arrival_id, [])
+    return graph
+
+
+def airport_ids(routes):
+    ids = {}
+    for route in routes:
+        for segment in route.segments:
+            ids[segment.departure_code] = segment.departure_id
+            ids[segment.arrival_code] = segment.arrival_id
+    return ids
+
+
+def shortest_paths(graph, sources, targets=None):
+    dist = {source: 0 for source in sources}
+    predecessors = {source: None for source in sources}
+    heap = [(0, source) for source in sources]
+    heapq.heapify(heap)
+    settled = set()
+
+    while heap:
+        cost, airport = heapq.heappop(heap)
+        if airport in settled:
+            continue
+        settled.add(airport)
+        if targets is not None and airport in targets:
+            return airport, dist, predecessors
+
+        for arrival, weight, route_index, segment in graph.get(airport, ()):
+            new_cost = cost + weight
+            if new_cost < dist.get(arrival, float('inf')):
+                dist[arrival] = new_cost
+                predecessors[arrival] = (airport, route_index, segment)
+                heapq.heappush(heap, (new_cost, arrival))
+
+    return None, dist, predecessors
+
+
+def reconstruct_path(predecessors, target):
+    segments = []
+    airport = target
+    while predecessors[airport] is not None:
+        airport, _, segment = predecessors[airport]
+        segments.append(segment)
+    segments.reverse()
+    return [segments[0].departure_code] + [segment.arrival_code for segment in segments], segments
+
+
+def route_endpoints(routes, origin, destination=None):
+    # Source and target airport ids of a search. City codes such as LON are not segment airports:
+    # they start from every itinerary's first departure and end at every last arrival instead.
+    ids = airport_ids(routes)
+    if origin in ids:
+        sources = [ids[origin]]
+    else:
+        sources = {route.segments[0].departure_id for route in routes}
+    if destination in ids:
+        targets = {ids[destination]}
+    else:
+        targets = {route.segments[-1].arrival_id for route in routes}
+    return sources, targets
+
+
+def dijkstra(routes, origin, destination=None):
+    if not routes:
+        return None
+
+    weights = route_weights(routes)
+    graph = build_route_graph(routes, weights)
+    sources, targets = route_endpoints(routes, origin, destination)
+
+    target, dist, predecessors = shortest_paths(graph, sources, targets)
+    if target is None or predecessors[target] is None:
+        return None
+
+    # The best route is the itinerary that supplies the last leg of the shortest path
+    airports, segments = reconstruct_path(predecessors, target)
+    _, route_index, _ = predecessors[target]
+    return BestRoute(routes[route_index], airports, segments, dist[target])